@@ -0,0 +1,179 @@
+"""
+The follow graph as cached adjacency sets.
+
+The user ids each user follows, and is followed by, are kept in the cache
+as sets so "is following" checks and the timeline fan-out never join
+through the ``Follower`` tables. Follows and unfollows write the graph in
+batches and drop the affected sets, which are rebuilt on the next read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Follower, FollowSuggestion
+
+
+FOLLOWING_KEY = 'follow-graph:following:{}'
+FOLLOWERS_KEY = 'follow-graph:followers:{}'
+
+# a row means ``to_follower`` follows ``from_follower``
+Edge = Follower.followers.through
+
+
+def _user_id(user):
+    return getattr(user, 'pk', user)
+
+
+def _get_set(key, user_id, queryset):
+    ids = cache.get(key.format(user_id))
+    if ids is None:
+        ids = frozenset(queryset)
+        cache.set(key.format(user_id), ids, settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def following_ids(user):
+    """
+    Returns the set of ids of the users ``user`` follows.
+    """
+    user_id = _user_id(user)
+    return _get_set(FOLLOWING_KEY, user_id, Edge.objects.filter(
+        to_follower__user=user_id).values_list(
+            'from_follower__user', flat=True))
+
+
+def follower_ids(user):
+    """
+    Returns the set of ids of the users following ``user``.
+    """
+    user_id = _user_id(user)
+    return _get_set(FOLLOWERS_KEY, user_id, Edge.objects.filter(
+        from_follower__user=user_id).values_list(
+            'to_follower__user', flat=True))
+
+
+def is_following(user, other):
+    return _user_id(other) in following_ids(user)
+
+
+def _invalidate(user_id, others):
+    keys = [FOLLOWING_KEY.format(user_id)]
+    keys.extend(FOLLOWERS_KEY.format(other) for other in others)
+    cache.delete_many(keys)
+
+
+def _get_profiles(user_ids):
+    """
+    Returns the ``Follower`` rows of ``user_ids`` keyed by user id,
+    creating the missing ones with a single insert.
+    """
+    profiles = dict((profile.user_id, profile) for profile in
+                    Follower.objects.filter(user__in=user_ids))
+    missing = set(user_ids).difference(profiles)
+    if missing:
+        try:
+            with transaction.atomic():
+                Follower.objects.bulk_create([Follower(user_id=user_id)
+                                              for user_id in missing])
+        except IntegrityError:
+            # a concurrent request created some of them first
+            for user_id in missing:
+                Follower.objects.get_or_create(user_id=user_id)
+        profiles.update((profile.user_id, profile) for profile in
+                        Follower.objects.filter(user__in=missing))
+    return profiles
+
+
+def follow(user, others):
+    """
+    Makes ``user`` follow every user in ``others`` and returns the ids of
+    the users that were not followed yet.
+    """
+    user_id = _user_id(user)
+    other_ids = set(_user_id(other) for other in others)
+    other_ids.discard(user_id)
+    requested = set(other_ids)
+    if not other_ids:
+        return []
+
+    with transaction.atomic():
+        profiles = _get_profiles(other_ids | set([user_id]))
+        # concurrent follows by the same user wait for this one here, so
+        # the check below sees their edges
+        follower = Follower.objects.select_for_update().get(
+            pk=profiles[user_id].pk)
+        # checked against the database, since the cached sets may lag
+        # behind a concurrent follow
+        other_ids.difference_update(Edge.objects.filter(
+            to_follower=follower, from_follower__user__in=other_ids
+        ).values_list('from_follower__user', flat=True))
+        Edge.objects.bulk_create([
+            Edge(from_follower=profiles[other_id], to_follower=follower)
+            for other_id in other_ids
+        ])
+        Follower.objects.filter(user__in=other_ids).update(
+            followers_count=F('followers_count') + 1)
+        Follower.objects.filter(pk=follower.pk).update(
+            following_count=F('following_count') + len(other_ids))
+
+    # even when nothing changed, in case the cache disagreed with the
+    # database
+    _invalidate(user_id, requested)
+    return list(other_ids)
+
+
+def unfollow(user, others):
+    """
+    Makes ``user`` stop following every user in ``others`` and returns the
+    ids of the users that were actually followed.
+    """
+    user_id = _user_id(user)
+    requested = set(_user_id(other) for other in others)
+
+    with transaction.atomic():
+        # one unfollow at a time per user, so counters drop only once
+        list(Follower.objects.select_for_update().filter(user=user_id))
+        edges = Edge.objects.filter(to_follower__user=user_id,
+                                    from_follower__user__in=requested)
+        other_ids = set(edges.values_list('from_follower__user', flat=True))
+        if other_ids:
+            edges.delete()
+            Follower.objects.filter(user__in=other_ids).update(
+                followers_count=F('followers_count') - 1)
+            Follower.objects.filter(user=user_id).update(
+                following_count=F('following_count') - len(other_ids))
+
+    # even when nothing changed, in case the cache disagreed with the
+    # database
+    _invalidate(user_id, requested)
+    return list(other_ids)
+
+
+def refresh_suggestions(user):
+    """
+    Replaces the follow suggestions of ``user`` with the users most
+    followed by the people they follow (friends of friends), or with the
+    most followed users overall when they follow nobody yet.
+    """
+    following = following_ids(user)
+    excluded = set(following) | set([user.pk])
+    limit = settings.FOLLOW_SUGGESTIONS_LIMIT
+    if following:
+        scores = Edge.objects.filter(
+            to_follower__user__in=following).exclude(
+                from_follower__user__in=excluded).values_list(
+                    'from_follower__user').annotate(
+                        score=Count('id')).order_by('-score')[:limit]
+    else:
+        scores = Follower.objects.exclude(user__in=excluded).filter(
+            followers_count__gt=0).order_by('-followers_count').values_list(
+                'user', 'followers_count')[:limit]
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user=user).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(user=user, suggested_id=suggested_id,
+                             score=score)
+            for suggested_id, score in scores
+        ])
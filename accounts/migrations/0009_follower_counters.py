@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Follower = apps.get_model('accounts', 'Follower')
+    counts = Follower.objects.annotate(
+        the_followers=Count('followers', distinct=True),
+        the_following=Count('following', distinct=True)).values_list(
+            'pk', 'the_followers', 'the_following')
+    for pk, followers, following in counts:
+        if followers or following:
+            Follower.objects.filter(pk=pk).update(followers_count=followers,
+                                                  following_count=following)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_myuser_stripe_customer_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follower',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='follower',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
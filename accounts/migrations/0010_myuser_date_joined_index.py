@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_follower_counters'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='myuser',
+            index_together=set([('date_joined', 'id')]),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models import Count, F
 from django.utils.translation import ugettext_lazy as _
 
 from datetime import datetime
@@ -78,6 +79,7 @@ class MyUser(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         app_label = 'accounts'
+        index_together = [['date_joined', 'id']]
 
     def __unicode__(self):
         return u"{}".format(self.username)
@@ -112,10 +114,34 @@ class MyUser(AbstractBaseUser, PermissionsMixin):
         return self.is_admin
 
 
+class FollowerManager(models.Manager):
+    def reconcile_counters(self):
+        """
+        Resets ``followers_count`` and ``following_count`` wherever the
+        counter drifted from the follow graph. Returns the number of
+        counters fixed.
+        """
+        fixed = 0
+        for field, related in (('followers_count', 'followers'),
+                               ('following_count', 'following')):
+            drifted = super(FollowerManager, self).get_queryset().annotate(
+                the_count=(Count(related))).exclude(
+                    **{field: F('the_count')}).values_list('pk', 'the_count')
+            for pk, count in drifted:
+                self.filter(pk=pk).update(**{field: count})
+                fixed += 1
+        return fixed
+
+
 class Follower(TimeStampedModel):
     user = models.OneToOneField(MyUser)
     followers = models.ManyToManyField('self', related_name='following',
                                        symmetrical=False)
+    followers_count = models.PositiveIntegerField(default=0, db_index=True,
+                                                  editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = FollowerManager()
 
     class Meta:
         ordering = ['-created']
@@ -140,7 +166,40 @@ class Follower(TimeStampedModel):
         return reverse('following_thread',
                        kwargs={'username': self.user.username})
 
-MyUser.profile = property(lambda u: Follower.objects.get_or_create(user=u)[0])
+
+def get_profile(user):
+    # memoized on the instance; was a get_or_create on every access
+    if not hasattr(user, '_profile_cache'):
+        user._profile_cache = Follower.objects.get_or_create(user=user)[0]
+    return user._profile_cache
+
+MyUser.profile = property(get_profile)
+
+
+class FollowSuggestionManager(models.Manager):
+    def suggested_ids(self, user):
+        return list(self.filter(user=user).values_list(
+            'suggested', flat=True))
+
+
+class FollowSuggestion(models.Model):
+    """
+    A user worth following, computed offline from the follow graph.
+    """
+    user = models.ForeignKey(MyUser, related_name='follow_suggestions')
+    suggested = models.ForeignKey(MyUser, related_name='+')
+    score = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = FollowSuggestionManager()
+
+    class Meta:
+        ordering = ['user', '-score']
+        unique_together = ('user', 'suggested')
+        app_label = 'accounts'
+
+    def __unicode__(self):
+        return u'{} -> {}'.format(self.user_id, self.suggested_id)
 
 
 # def new_user_receiver(sender, instance, created, *args, **kwargs):
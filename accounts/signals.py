@@ -1,10 +1,11 @@
-from django.core.cache import cache
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from core.cache import invalidate
+
 from .models import MyUser
 
 
 @receiver(post_save, sender=MyUser)
-def clear_cache(sender, instance, created, **kwargs):
-    cache.clear()
+def invalidate_cache(sender, instance, created, **kwargs):
+    invalidate(instance)
@@ -0,0 +1,15 @@
+from __future__ import absolute_import
+
+from celery import shared_task
+
+from . import graph
+from .models import MyUser
+
+
+@shared_task
+def refresh_follow_suggestions():
+    """
+    Recomputes the follow suggestions of every active user.
+    """
+    for user in MyUser.objects.filter(is_active=True).only('pk').iterator():
+        graph.refresh_suggestions(user)
@@ -1,3 +1,76 @@
+from mock import patch
+
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.test import TestCase
 
-# Create your tests here.
+from . import graph
+from .models import Follower, FollowSuggestion, MyUser
+
+
+def make_user(username='testuser', email='test@user.com', password='testuser'):
+    return MyUser.objects.create_user(username=username, email=email,
+        password=password)
+
+
+class FollowGraphUnitTest(TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.friend = make_user(username='friend', email='f@user.com')
+        self.other = make_user(username='other', email='o@user.com')
+
+    def test_follow_and_unfollow_in_batches(self):
+        self.assertEqual(sorted(graph.follow(self.user,
+            [self.friend, self.other, self.user])),
+            sorted([self.friend.pk, self.other.pk]))
+        self.assertEqual(graph.follow(self.user, [self.friend]), [],
+            'following twice should be a no-op.')
+
+        self.assertTrue(graph.is_following(self.user, self.friend))
+        self.assertEqual(graph.follower_ids(self.friend),
+                         set([self.user.pk]))
+        self.assertEqual(Follower.objects.get(
+            user=self.user).following_count, 2)
+
+        graph.unfollow(self.user, [self.friend])
+
+        self.assertFalse(graph.is_following(self.user, self.friend),
+            'unfollowing should drop the cached adjacency set.')
+        self.assertEqual(Follower.objects.get(
+            user=self.friend).followers_count, 0)
+
+    def test_stale_cache_dropped_by_follow(self):
+        graph.follow(self.user, [self.friend])
+        # as stored by a reader racing the follow
+        cache.set(graph.FOLLOWING_KEY.format(self.user.pk), frozenset())
+
+        self.assertEqual(graph.follow(self.user, [self.friend]), [])
+        self.assertTrue(graph.is_following(self.user, self.friend),
+            'a follow that changed nothing should still drop the cached '
+            'set.')
+
+    def test_profiles_created_concurrently(self):
+        bulk_create = Follower.objects.bulk_create
+
+        def racing_bulk_create(profiles):
+            # another request inserts the same profiles first
+            bulk_create([Follower(user_id=profile.user_id)
+                         for profile in profiles])
+            raise IntegrityError('duplicate key value')
+
+        with patch.object(Follower.objects, 'bulk_create',
+                          side_effect=racing_bulk_create):
+            self.assertEqual(graph.follow(self.user, [self.friend]),
+                             [self.friend.pk])
+        self.assertEqual(Follower.objects.get(
+            user=self.user).following_count, 1)
+
+    def test_suggestions_are_friends_of_friends(self):
+        graph.follow(self.user, [self.friend])
+        graph.follow(self.friend, [self.other])
+
+        graph.refresh_suggestions(self.user)
+
+        self.assertEqual(FollowSuggestion.objects.suggested_ids(self.user),
+                         [self.other.pk])
@@ -9,31 +9,35 @@ from django.shortcuts import (get_object_or_404, HttpResponseRedirect,
                               redirect, render)
 from django.utils.encoding import force_text
 from django.utils.http import urlsafe_base64_decode
-from django.views.decorators.cache import cache_page, never_cache
+from django.views.decorators.cache import never_cache
 from django.views.decorators.debug import sensitive_post_parameters
 from django.views.decorators.http import require_http_methods
 
 # from analytics.signals import page_view
+from core.cache import cache_page_depends, depends_on, invalidate
 from notifications.signals import notify
-from photos.models import Photo
+from photos.models import Photo, TimelineEntry
 
 from .forms import (AccountBasicsChangeForm, LoginForm, PasswordChangeForm,
                     RegisterForm, ResetPasswordForm, SetPasswordForm)
+from . import graph
 from .models import Follower, MyUser
 
 # Create your views here.
 
 
 @login_required
-@cache_page(60 * 2)
+@cache_page_depends(60 * 2)
 def profile_view(request, username):
     user = get_object_or_404(MyUser, username=username)
+    depends_on(request, user)
 
     if user.username == "anonymous":
         return render(request, "accounts/anonymous.html", {})
     else:
-        photos = Photo.objects.select_related(
-                'category', 'creator').filter(creator=user)[:150]
+        photos = list(Photo.objects.select_related(
+                'category', 'creator').filter(creator=user)[:150])
+        depends_on(request, *photos)
 
         try:
             follow = Follower.objects.get(user=user)
@@ -45,31 +49,38 @@ def profile_view(request, username):
         #     page_path=request.get_full_path(),
         # )
 
+        # per-viewer state, kept out of the cached photo fragments
+        viewer_is_following = graph.is_following(request.user, user)
+
         context = {
             'follow': follow,
+            'liked_photo_ids': Photo.objects.liked_ids(request.user, photos),
             'photos': photos,
-            'user': user
+            'user': user,
+            'viewer_is_following': viewer_is_following
         }
         return render(request, "accounts/profile_view.html", context)
 
 
-@cache_page(60 * 4)
+@cache_page_depends(60 * 4)
 def followers_thread(request, username):
     try:
         user = MyUser.objects.get(username=username)
     except MyUser.DoesNotExist:
         raise Http404
+    depends_on(request, user)
     followers_set = Follower.objects.filter(user=user.id)
     return render(request, "accounts/followers_thread.html",
                   {'followers_set': followers_set})
 
 
-@cache_page(60 * 4)
+@cache_page_depends(60 * 4)
 def following_thread(request, username):
     try:
         user = MyUser.objects.get(username=username)
     except MyUser.DoesNotExist:
         raise Http404
+    depends_on(request, user)
     following_set = Follower.objects.filter(user=user.id)
     return render(request, "accounts/following_thread.html",
                   {"following_set": following_set})
@@ -78,22 +89,15 @@ def following_thread(request, username):
 @login_required
 @require_http_methods(['POST'])
 def follow_ajax(request):
-    follower, created = Follower.objects.get_or_create(user=request.user)
     user_id = request.POST.get('user_id')
     user = get_object_or_404(MyUser, id=user_id)
 
-    followed, created = Follower.objects.get_or_create(user=user)
-
-    try:
-        user_followed = Follower.objects.get(user=user, followers=follower)
-    except Follower.DoesNotExist:
-        user_followed = None
-
-    if user_followed:
-        followed.followers.remove(follower)
+    if graph.is_following(request.user, user):
+        graph.unfollow(request.user, [user])
+        TimelineEntry.objects.unfollow(request.user, user)
         viewer_has_followed = False
-    else:
-        followed.followers.add(follower)
+    elif graph.follow(request.user, [user]):
+        TimelineEntry.objects.follow(request.user, user)
         viewer_has_followed = True
 
         notify.send(
@@ -101,19 +105,23 @@ def follow_ajax(request):
             recipient=user,
             verb='is now supporting you'
         )
+    else:
+        # following yourself, or the cached graph was stale; follow()
+        # has dropped it, so this reads the database
+        viewer_has_followed = graph.is_following(request.user, user)
 
-    followed.save()
-    user.save()
+    # evicts the cached pages showing the counters
+    invalidate(request.user, user)
 
     data = {
         "viewer_has_followed": viewer_has_followed,
-        "followers_count": followed.followers.count()
+        "followers_count": Follower.objects.filter(user=user).values_list(
+            'followers_count', flat=True).first() or 0
     }
     return JsonResponse(data)
 
 
 @login_required
-@cache_page(60)
 def account_settings(request):
     user = request.user
     account_change_form = AccountBasicsChangeForm(request.POST or None,
@@ -155,7 +163,6 @@ def password_change(request):
                   {'form': form})
 
 
-@cache_page(60 * 10)
 def password_reset(request,
                    template_name='accounts/settings/password_reset_form.html',
                    email_template_name='accounts/settings/password_reset_email.html',
@@ -222,7 +229,6 @@ def auth_logout(request):
     return HttpResponseRedirect(reverse("home"))
 
 
-@cache_page(60 * 10)
 def auth_login(request):
     if request.user.is_authenticated():
         return redirect("home")
@@ -255,7 +261,6 @@ def auth_login(request):
         return render(request, "visitor/login_register.html", context)
 
 
-@cache_page(60 * 10)
 def auth_register(request):
     if request.user.is_authenticated():
         return redirect("home")
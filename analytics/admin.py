@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import PageView
+from .models import PageView, PageViewRollup
 
 # Register your models here.
 
@@ -14,3 +14,14 @@ class PageViewAdmin(admin.ModelAdmin):
         model = PageView
 
 admin.site.register(PageView, PageViewAdmin)
+
+
+class PageViewRollupAdmin(admin.ModelAdmin):
+    list_display = ['path', 'period', 'start', 'views']
+    list_filter = ['period']
+    search_fields = ['path']
+
+    class Meta:
+        model = PageViewRollup
+
+admin.site.register(PageViewRollup, PageViewRollupAdmin)
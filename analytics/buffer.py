@@ -0,0 +1,42 @@
+"""
+Redis list buffering page views between the request that records them
+and the task that writes them to the database in batches.
+"""
+import json
+
+from django.utils.dateparse import parse_datetime
+
+from core.connections import get_redis_connection
+
+
+BUFFER_KEY = 'analytics:page-views'
+LOCK_KEY = 'analytics:flush-lock'
+LOCK_TIMEOUT = 60 * 5
+
+
+def push(record):
+    record = dict(record, created=record['created'].isoformat())
+    get_redis_connection().rpush(BUFFER_KEY, json.dumps(record))
+
+
+def pop(count):
+    """
+    Removes and returns up to ``count`` of the oldest records.
+    """
+    pipeline = get_redis_connection().pipeline()
+    pipeline.lrange(BUFFER_KEY, 0, count - 1)
+    pipeline.ltrim(BUFFER_KEY, count, -1)
+    records, trimmed = pipeline.execute()
+
+    records = [json.loads(record.decode('utf-8')) for record in records]
+    for record in records:
+        record['created'] = parse_datetime(record['created'])
+    return records
+
+
+def acquire_flush_lock():
+    return get_redis_connection().set(LOCK_KEY, 1, ex=LOCK_TIMEOUT, nx=True)
+
+
+def release_flush_lock():
+    get_redis_connection().delete(LOCK_KEY)
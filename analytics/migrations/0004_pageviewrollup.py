@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('analytics', '0003_pageview_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageViewRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('period', models.CharField(max_length=4, choices=[('hour', 'Hour'), ('day', 'Day')])),
+                ('start', models.DateTimeField()),
+                ('path', models.CharField(max_length=350)),
+                ('primary_object_id', models.PositiveIntegerField(null=True, blank=True)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('primary_content_type', models.ForeignKey(related_name='rollups', blank=True, to='contenttypes.ContentType', null=True)),
+            ],
+            options={
+                'ordering': ['-start'],
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='pageviewrollup',
+            index_together=set([('period', 'start', 'path'), ('primary_content_type', 'primary_object_id', 'period', 'start')]),
+        ),
+    ]
@@ -2,8 +2,9 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
-from core.models import TimeStampedModel
 from photos.models import Category, Photo
 
 
@@ -36,7 +37,11 @@ class PageViewManager(models.Manager):
         return self.get_queryset().users()
 
 
-class PageView(TimeStampedModel):
+class PageView(models.Model):
+    # not a ``TimeStampedModel``: page views are written in batches, and
+    # ``auto_now_add`` would stamp them with the time of the write
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    modified = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True)
     path = models.CharField(max_length=350)
 
@@ -61,3 +66,73 @@ class PageView(TimeStampedModel):
 
     class Meta:
         ordering = ['-created']
+
+
+class PageViewRollupManager(models.Manager):
+    def add(self, page_views):
+        """
+        Adds ``page_views`` (``(created, path, content_type_id, object_id)``
+        tuples) to the hourly and daily rollups.
+        """
+        counts = {}
+        for created, path, content_type_id, object_id in page_views:
+            hour = created.replace(minute=0, second=0, microsecond=0)
+            for period, start in ((PageViewRollup.HOUR, hour),
+                                  (PageViewRollup.DAY, hour.replace(hour=0))):
+                key = (period, start, path, content_type_id, object_id)
+                counts[key] = counts.get(key, 0) + 1
+
+        for key, views in counts.items():
+            period, start, path, content_type_id, object_id = key
+            fields = {
+                'period': period,
+                'start': start,
+                'path': path,
+                'primary_content_type_id': content_type_id,
+                'primary_object_id': object_id,
+            }
+            updated = self.filter(**fields).update(views=F('views') + views)
+            if not updated:
+                self.create(views=views, **fields)
+
+    def for_object(self, obj, period):
+        content_type = ContentType.objects.get_for_model(obj)
+        return self.filter(period=period, primary_content_type=content_type,
+                           primary_object_id=obj.pk)
+
+
+class PageViewRollup(models.Model):
+    """
+    Number of page views per path and primary object over an hour or a
+    day, so reports don't have to scan ``PageView``.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = (
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    )
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    start = models.DateTimeField()
+    path = models.CharField(max_length=350)
+
+    primary_content_type = models.ForeignKey(ContentType,
+                                             related_name='rollups',
+                                             null=True, blank=True)
+    primary_object_id = models.PositiveIntegerField(null=True, blank=True)
+    primary_object = GenericForeignKey("primary_content_type",
+                                       "primary_object_id")
+
+    views = models.PositiveIntegerField(default=0)
+
+    objects = PageViewRollupManager()
+
+    def __unicode__(self):
+        return u"{} {} {}".format(self.path, self.period, self.start)
+
+    class Meta:
+        ordering = ['-start']
+        index_together = [
+            ['period', 'start', 'path'],
+            ['primary_content_type', 'primary_object_id', 'period', 'start'],
+        ]
@@ -1,12 +1,16 @@
+import logging
+
+from redis import RedisError
+
 from django.contrib.contenttypes.models import ContentType
-from django.core.cache import cache
-from django.db.models.signals import post_save
-from django.dispatch import receiver, Signal
+from django.dispatch import Signal
+from django.utils import timezone
 
-from datetime import datetime
+from . import buffer
+from .models import PageView, PageViewRollup
 
-from .models import PageView
 
+logger = logging.getLogger(__name__)
 
 page_view = Signal(providing_args=[
                    'page_path',
@@ -14,35 +18,47 @@ page_view = Signal(providing_args=[
                    'secondary_obj'])
 
 
-def page_view_received(sender, **kwargs):
-    kwargs.pop('signal', None)
-    page_path = kwargs.pop('page_path')
-    primary_obj = kwargs.pop('primary_obj', None)
-    secondary_obj = kwargs.pop('secondary_obj', None)
-    user = sender
-
-    if not user.is_authenticated():
-        new_page_view = PageView.objects.create(path=page_path,
-                                                created=datetime.now())
-    else:
-        new_page_view = PageView.objects.create(path=page_path, user=user,
-                                                created=datetime.now())
-
-    if primary_obj:
-        new_page_view.primary_object_id = primary_obj.id
-        new_page_view.primary_content_type = ContentType.objects.get_for_model(
-            primary_obj)
-
-    if secondary_obj:
-        new_page_view.secondary_object_id = secondary_obj.id
-        new_page_view.secondary_content_type = ContentType.objects.get_for_model(
-            secondary_obj)
-
-    new_page_view.save()
+def make_record(user, page_path, primary_obj=None, secondary_obj=None):
+    record = {
+        'path': page_path,
+        'user': user.pk if user.is_authenticated() else None,
+        'created': timezone.now(),
+    }
+    for option, obj in (('primary', primary_obj),
+                        ('secondary', secondary_obj)):
+        record['{}_content_type'.format(option)] = (
+            ContentType.objects.get_for_model(obj).pk if obj else None)
+        record['{}_object_id'.format(option)] = obj.pk if obj else None
+    return record
 
-page_view.connect(page_view_received)
 
+def save_records(records):
+    """
+    Writes buffered page view records with one insert and adds them to
+    the rollups, both stamped with the time of the view.
+    """
+    PageView.objects.bulk_create([PageView(
+        created=record['created'],
+        path=record['path'],
+        user_id=record['user'],
+        primary_content_type_id=record['primary_content_type'],
+        primary_object_id=record['primary_object_id'],
+        secondary_content_type_id=record['secondary_content_type'],
+        secondary_object_id=record['secondary_object_id'],
+    ) for record in records])
+    PageViewRollup.objects.add(
+        (record['created'], record['path'], record['primary_content_type'],
+         record['primary_object_id']) for record in records)
 
-@receiver(post_save, sender=PageView)
-def clear_cache(sender, instance, created, **kwargs):
-    cache._cache.flush_all()
+
+def page_view_received(sender, **kwargs):
+    record = make_record(sender, kwargs['page_path'],
+                         primary_obj=kwargs.get('primary_obj'),
+                         secondary_obj=kwargs.get('secondary_obj'))
+    try:
+        buffer.push(record)
+    except RedisError:
+        logger.exception('Could not buffer page view, saving it directly.')
+        save_records([record])
+
+page_view.connect(page_view_received)
@@ -0,0 +1,27 @@
+from __future__ import absolute_import
+
+from celery import shared_task
+
+from django.conf import settings
+
+from . import buffer
+from .signals import save_records
+
+
+@shared_task
+def flush_page_views():
+    """
+    Moves the page views buffered in Redis to the database in batches of
+    ``ANALYTICS_FLUSH_BATCH_SIZE``.
+    """
+    if not buffer.acquire_flush_lock():
+        return
+    try:
+        while True:
+            records = buffer.pop(settings.ANALYTICS_FLUSH_BATCH_SIZE)
+            if records:
+                save_records(records)
+            if len(records) < settings.ANALYTICS_FLUSH_BATCH_SIZE:
+                break
+    finally:
+        buffer.release_flush_lock()
@@ -1,3 +1,115 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
 
-# Create your tests here.
+from mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import buffer
+from .models import PageView, PageViewRollup
+from .signals import make_record
+from .tasks import flush_page_views
+
+
+class FakeRedis(object):
+    """
+    The few list and key commands the page view buffer uses.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value.encode('utf-8'))
+
+    def lrange(self, key, start, end):
+        return self.data.get(key, [])[start:None if end == -1 else end + 1]
+
+    def ltrim(self, key, start, end):
+        self.data[key] = self.lrange(key, start, end)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def lrange(self, *args):
+        self.commands.append((self.redis.lrange, args))
+
+    def ltrim(self, *args):
+        self.commands.append((self.redis.ltrim, args))
+
+    def execute(self):
+        return [command(*args) for command, args in self.commands]
+
+
+class PageViewRollupUnitTest(TestCase):
+
+    def test_views_counted_per_hour_and_day(self):
+        PageViewRollup.objects.add([
+            (datetime(2015, 9, 1, 10, 5), '/a/', None, None),
+            (datetime(2015, 9, 1, 10, 55), '/a/', None, None),
+            (datetime(2015, 9, 1, 11, 5), '/a/', None, None),
+        ])
+        PageViewRollup.objects.add([
+            (datetime(2015, 9, 1, 11, 30), '/a/', None, None),
+        ])
+
+        hours = PageViewRollup.objects.filter(
+            period=PageViewRollup.HOUR).order_by('start')
+        self.assertEqual([rollup.views for rollup in hours], [2, 2])
+        self.assertEqual(PageViewRollup.objects.get(
+            period=PageViewRollup.DAY).views, 4, 'the daily rollup did not '
+            'add up the views of every batch.')
+
+
+@override_settings(ANALYTICS_FLUSH_BATCH_SIZE=2)
+class PageViewBufferUnitTest(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.patch = patch('analytics.buffer.get_redis_connection',
+                           return_value=self.redis)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_flush_keeps_the_time_of_the_view(self):
+        viewed = timezone.now() - timedelta(minutes=10)
+        for path in ('/a/', '/b/', '/c/'):
+            record = make_record(AnonymousUser(), path)
+            record['created'] = viewed
+            buffer.push(record)
+
+        flush_page_views()
+
+        self.assertEqual(sorted(PageView.objects.values_list(
+            'path', flat=True)), ['/a/', '/b/', '/c/'], 'every batch '
+            'should be written.')
+        self.assertEqual(set(PageView.objects.values_list(
+            'created', flat=True)), set([viewed]))
+        self.assertEqual(buffer.pop(10), [], 'flushed views should be '
+            'removed from the buffer.')
+
+    def test_flush_skipped_while_locked(self):
+        buffer.push(make_record(AnonymousUser(), '/a/'))
+        self.assertTrue(buffer.acquire_flush_lock())
+
+        flush_page_views()
+
+        self.assertFalse(PageView.objects.exists())
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.db.models import Prefetch
+
 from rest_framework import permissions, serializers, viewsets
 from rest_framework.authentication import (BasicAuthentication,
                                            SessionAuthentication)
@@ -7,9 +10,16 @@ from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from accounts.models import Follower, MyUser
 from photos.models import Photo
 
+from .mixins import DynamicFieldsMixin, EagerLoadingMixin
 from .photo_serializers import PhotoSerializer
 
 
+def prefetch_photos():
+    queryset = PhotoSerializer.setup_eager_loading(Photo.objects.all())
+    return Prefetch('photo_set', queryset=queryset,
+                    to_attr='prefetched_photos')
+
+
 class FollowerCreateSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source='user.username', read_only=True)
 
@@ -77,11 +87,21 @@ class MyUserUrlField(serializers.HyperlinkedIdentityField):
                        request=request, format=format)
 
 
-class MyUserSerializer(serializers.HyperlinkedModelSerializer):
+class MyUserSerializer(DynamicFieldsMixin, EagerLoadingMixin,
+                       serializers.HyperlinkedModelSerializer):
     account_url = MyUserUrlField("user_profile_detail_api")
     follower = FollowerSerializer(read_only=True)
     photo_set = serializers.SerializerMethodField()
 
+    select_related_fields = {
+        'follower': ('follower',),
+    }
+    prefetch_related_fields = {
+        'follower': ('follower__followers__user',
+                     'follower__following__user'),
+        'photo_set': (prefetch_photos,),
+    }
+
     class Meta:
         model = MyUser
         fields = [
@@ -103,14 +123,95 @@ class MyUserSerializer(serializers.HyperlinkedModelSerializer):
             'date_joined',
             'modified'
         ]
+        expandable_fields = ['photo_set', 'follower']
 
     def get_photo_set(self, request):
-        queryset = Photo.objects.own(request.pk)
+        queryset = getattr(request, 'prefetched_photos', None)
+        if queryset is None:
+            queryset = Photo.objects.own(request.pk)
         serializer = PhotoSerializer(queryset, context=self.context,
                                      many=True, read_only=True)
         return serializer.data
 
 
+class MyUserSummaryListSerializer(serializers.ListSerializer):
+    """
+    Loads the photo counts and newest thumbnails of every listed user with
+    one bounded query before serializing them.
+    """
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+        newest = Photo.objects.newest_per_creator(
+            [user.pk for user in users], settings.USER_SUMMARY_THUMBNAILS)
+        for user in users:
+            user.summary_photos_count, user.summary_photos = newest[user.pk]
+        return super(MyUserSummaryListSerializer, self).to_representation(
+            users)
+
+
+class MyUserSummarySerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """
+    A compact user for list endpoints: counts, a few thumbnails and a link
+    to the paginated photos of the user.
+    """
+    account_url = MyUserUrlField("user_profile_detail_api")
+    photos_url = MyUserUrlField("user_photo_list_api")
+    followers_count = serializers.SerializerMethodField()
+    following_count = serializers.SerializerMethodField()
+    photos_count = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+
+    select_related_fields = {
+        'followers_count': ('follower',),
+        'following_count': ('follower',),
+    }
+
+    class Meta:
+        model = MyUser
+        list_serializer_class = MyUserSummaryListSerializer
+        fields = [
+            'id',
+            'account_url',
+            'username',
+            'full_name',
+            'profile_picture',
+            'is_verified',
+            'followers_count',
+            'following_count',
+            'photos_count',
+            'thumbnails',
+            'photos_url',
+        ]
+
+    def _get_follower(self, obj):
+        try:
+            return obj.follower
+        except Follower.DoesNotExist:
+            return None
+
+    def _get_photos(self, obj):
+        if not hasattr(obj, 'summary_photos'):
+            obj.summary_photos_count, obj.summary_photos = (
+                Photo.objects.newest_per_creator(
+                    [obj.pk], settings.USER_SUMMARY_THUMBNAILS)[obj.pk])
+        return obj.summary_photos_count, obj.summary_photos
+
+    def get_followers_count(self, obj):
+        follower = self._get_follower(obj)
+        return follower.followers_count if follower else 0
+
+    def get_following_count(self, obj):
+        follower = self._get_follower(obj)
+        return follower.following_count if follower else 0
+
+    def get_photos_count(self, obj):
+        return self._get_photos(obj)[0]
+
+    def get_thumbnails(self, obj):
+        return [photo.get_thumbnail_url() for photo in
+                self._get_photos(obj)[1]]
+
+
 class MyUserViewSet(viewsets.ModelViewSet):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
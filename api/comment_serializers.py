@@ -1,3 +1,5 @@
+from django.db.models import Prefetch
+
 from rest_framework import permissions, serializers, viewsets
 from rest_framework.authentication import (BasicAuthentication,
                                            SessionAuthentication)
@@ -6,6 +8,23 @@ from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 
 from comments.models import Comment
 
+from .mixins import DynamicFieldsMixin, EagerLoadingMixin
+
+
+def prefetch_children():
+    return Prefetch('comment_set', queryset=Comment.objects.threaded(),
+                    to_attr='prefetched_children')
+
+
+def get_children_queryset(instance):
+    # threads assembled by build_tree already carry their replies
+    children = getattr(instance, 'tree_children', None)
+    if children is None:
+        children = getattr(instance, 'prefetched_children', None)
+    if children is None:
+        children = Comment.objects.threaded().filter(parent__pk=instance.pk)
+    return children
+
 
 class CommentCreateSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
@@ -22,13 +41,21 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         ]
 
 
-class CommentUpdateSerializer(serializers.ModelSerializer):
+class CommentUpdateSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     children = serializers.SerializerMethodField(read_only=True)
     user = serializers.CharField(source='user.username', read_only=True)
     user_url = serializers.HyperlinkedRelatedField(
         view_name='user_profile_detail_api', read_only=True,
         lookup_field='username')
 
+    select_related_fields = {
+        'user': ('user',),
+        'user_url': ('user',),
+    }
+    prefetch_related_fields = {
+        'children': (prefetch_children,),
+    }
+
     class Meta:
         model = Comment
         fields = [
@@ -40,7 +67,7 @@ class CommentUpdateSerializer(serializers.ModelSerializer):
         ]
 
     def get_children(self, instance):
-        queryset = Comment.objects.filter(parent__pk=instance.pk)
+        queryset = get_children_queryset(instance)
         serializer = ChildCommentSerializer(queryset,
                                             context={"request": instance},
                                             many=True)
@@ -85,7 +112,8 @@ class CommentPhotoUrlField(serializers.HyperlinkedIdentityField):
             return None
 
 
-class CommentSerializer(serializers.HyperlinkedModelSerializer):
+class CommentSerializer(DynamicFieldsMixin, EagerLoadingMixin,
+                        serializers.HyperlinkedModelSerializer):
     photo = CommentPhotoUrlField("photo_detail_api")
     comment_url = serializers.HyperlinkedIdentityField("comment_detail_api",
                                                        lookup_field='id')
@@ -95,6 +123,14 @@ class CommentSerializer(serializers.HyperlinkedModelSerializer):
     text = serializers.CharField(read_only=True)
     children = serializers.SerializerMethodField(read_only=True)
 
+    select_related_fields = {
+        'photo': ('photo__category',),
+        'user': ('user',),
+    }
+    prefetch_related_fields = {
+        'children': (prefetch_children,),
+    }
+
     class Meta:
         model = Comment
         fields = [
@@ -105,9 +141,10 @@ class CommentSerializer(serializers.HyperlinkedModelSerializer):
             'text',
             'children',
         ]
+        expandable_fields = ['children']
 
     def get_children(self, instance):
-        queryset = Comment.objects.filter(parent__pk=instance.pk)
+        queryset = get_children_queryset(instance)
         serializer = ChildCommentSerializer(queryset,
                                             context={"request": instance},
                                             many=True)
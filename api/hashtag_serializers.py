@@ -9,4 +9,5 @@ class HashtagSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'tag',
+            'usage_count',
         ]
@@ -0,0 +1,47 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.fast import FastPhotoSerializer
+from api.photo_serializers import PhotoSerializer
+from photos.models import Photo
+
+
+class Command(BaseCommand):
+    help = ('Times PhotoSerializer against FastPhotoSerializer over the '
+            'newest photos and checks that both render the same JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--photos', type=int, default=250)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/photos/'))
+        pks = list(Photo.objects.order_by('-created', '-id').values_list(
+            'pk', flat=True)[:options['photos']])
+
+        def slow():
+            queryset = PhotoSerializer.setup_eager_loading(
+                Photo.objects.filter(pk__in=pks))
+            photos = dict((photo.pk, photo) for photo in queryset)
+            return PhotoSerializer([photos[pk] for pk in pks], many=True,
+                                   context={'request': request}).data
+
+        def fast():
+            return FastPhotoSerializer(request).serialize(pks)
+
+        renderer = JSONRenderer()
+        if renderer.render(slow()) != renderer.render(fast()):
+            raise CommandError('The serializers rendered different JSON.')
+
+        repeat = options['repeat']
+        slow_time = min(timeit.repeat(slow, number=1, repeat=repeat))
+        fast_time = min(timeit.repeat(fast, number=1, repeat=repeat))
+        self.stdout.write('{} photos: {:.1f}ms vs {:.1f}ms, {:.1f}x '
+                          'faster.'.format(len(pks), slow_time * 1000,
+                                           fast_time * 1000,
+                                           slow_time / max(fast_time, 1e-9)))
@@ -0,0 +1,181 @@
+from django.db.models.query import QuerySet, prefetch_related_objects
+from django.utils.http import parse_etags, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.conditional import make_etag
+
+
+class EagerLoadingMixin(object):
+    """
+    Lets a serializer declare, per field, the related data it needs so list
+    views can load it up front instead of once per serialized object.
+
+    ``select_related_fields`` and ``prefetch_related_fields`` map a field
+    name to the lookups it needs. Prefetch lookups may be callables
+    returning a ``Prefetch`` so that a fresh one is built on every use.
+    """
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    @classmethod
+    def get_related_lookups(cls, fields=None):
+        select_related = []
+        prefetch_related = []
+        for name, lookups in cls.select_related_fields.items():
+            if fields is None or name in fields:
+                select_related.extend(lookups)
+        for name, lookups in cls.prefetch_related_fields.items():
+            if fields is None or name in fields:
+                prefetch_related.extend(
+                    lookup() if callable(lookup) else lookup
+                    for lookup in lookups)
+        return select_related, prefetch_related
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        Applies the related lookups needed by ``fields`` (all fields by
+        default) to ``queryset``, which may also be a list of instances.
+        """
+        select_related, prefetch_related = cls.get_related_lookups(fields)
+
+        if not isinstance(queryset, QuerySet):
+            if prefetch_related:
+                prefetch_related_objects(queryset, prefetch_related)
+            return queryset
+
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+def _split_param(request, name):
+    value = request.query_params.get(name, '')
+    return set(field.strip() for field in value.split(',') if field.strip())
+
+
+class DynamicFieldsMixin(object):
+    """
+    Lets clients trim the response of the view's serializer: ``?fields=``
+    lists the fields to return and ``?expand=`` opts into the costly ones
+    declared in ``Meta.expandable_fields``, which are left out whenever
+    either parameter is given unless ``fields=`` names them. Fields that
+    aren't returned are never computed, and eager loading only covers the
+    returned ones.
+    """
+
+    @classmethod
+    def get_selected_fields(cls, request):
+        """
+        Returns the names of the fields requested in ``request``, or None
+        when the client asked for the full representation.
+        """
+        if request is None:
+            return None
+        fields = _split_param(request, 'fields')
+        expand = _split_param(request, 'expand')
+        if not fields and not expand:
+            return None
+
+        expandable = set(getattr(cls.Meta, 'expandable_fields', ()))
+        if fields:
+            # expandable fields named in ``fields=`` are kept
+            return fields | (expand & expandable)
+        return (set(cls.Meta.fields) - expandable) | (expand & expandable)
+
+    def get_fields(self):
+        fields = super(DynamicFieldsMixin, self).get_fields()
+
+        # nested serializers share the context but not the parameters
+        view = self.context.get('view')
+        if view is None or view.get_serializer_class() is not type(self):
+            return fields
+
+        selected = self.get_selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in list(fields):
+                if name not in selected:
+                    fields.pop(name)
+        return fields
+
+
+class EagerLoadingAPIViewMixin(object):
+    """
+    Applies the eager loading declared by the view's serializer to the
+    queryset of list views, limited to the fields the client selected.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super(EagerLoadingAPIViewMixin, self).filter_queryset(
+            queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            fields = None
+            if hasattr(serializer_class, 'get_selected_fields'):
+                fields = serializer_class.get_selected_fields(self.request)
+            queryset = serializer_class.setup_eager_loading(queryset,
+                                                            fields=fields)
+        return queryset
+
+
+class NotModified(Exception):
+    """
+    Raised by ``ConditionalGetMixin`` once it knows the client's copy is
+    current, to skip the rest of the view.
+    """
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers GETs with 304 Not Modified while the client's ETag still
+    matches. List views build the ETag with ``get_page_state()`` from the
+    page they fetched, before it is serialized; by default the pk and
+    ``state_fields`` of its rows. Other views may build it up front with
+    ``get_state()`` or call ``check_not_modified()`` themselves. A state
+    of None serves the response without an ETag.
+    """
+    state_fields = ('modified',)
+
+    def get_state(self):
+        return None
+
+    def get_page_state(self, page):
+        rows = [tuple(getattr(obj, name)
+                      for name in ('pk',) + self.state_fields)
+                for obj in page]
+        # the links around the page, and the count page number pagination
+        # returns along with it
+        paginator = getattr(getattr(self.paginator, 'page', None),
+                            'paginator', None)
+        return (rows, self.paginator.get_next_link(),
+                paginator.count if paginator is not None else None)
+
+    def paginate_queryset(self, queryset):
+        page = super(ConditionalGetMixin, self).paginate_queryset(queryset)
+        if page is not None:
+            self.check_not_modified(self.get_page_state(page))
+        return page
+
+    def check_not_modified(self, state):
+        if state is None:
+            return
+        self.etag = make_etag(self.request, state,
+                              self.request.accepted_renderer.format)
+        etags = parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if self.etag in etags or '*' in etags:
+            raise NotModified
+
+    def get(self, request, *args, **kwargs):
+        self.etag = None
+        try:
+            self.check_not_modified(self.get_state())
+            response = super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs)
+        except NotModified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        if self.etag is not None:
+            response['ETag'] = quote_etag(self.etag)
+        return response
@@ -3,6 +3,8 @@ from rest_framework.reverse import reverse
 
 from notifications.models import Notification
 
+from .mixins import DynamicFieldsMixin, EagerLoadingMixin
+
 
 class NotificationRecipientUrlField(serializers.HyperlinkedIdentityField):
     def get_url(self, obj, view_name, request, format):
@@ -22,7 +24,8 @@ class NotificationSenderUrlField(serializers.HyperlinkedIdentityField):
                        request=request, format=format)
 
 
-class NotificationSerializer(serializers.HyperlinkedModelSerializer):
+class NotificationSerializer(DynamicFieldsMixin, EagerLoadingMixin,
+                             serializers.HyperlinkedModelSerializer):
     recipient = NotificationRecipientUrlField("user_profile_detail_api")
     sender = serializers.CharField(source='sender_object', read_only=True)
     sender_url = NotificationSenderUrlField("user_profile_detail_api")
@@ -31,6 +34,16 @@ class NotificationSerializer(serializers.HyperlinkedModelSerializer):
                                       read_only=True)
     target_slug = serializers.CharField(source='target_object', read_only=True)
 
+    select_related_fields = {
+        'recipient': ('recipient',),
+    }
+    prefetch_related_fields = {
+        'sender': ('sender_object',),
+        'sender_url': ('sender_object',),
+        'action': ('action_object',),
+        'target_slug': ('target_object',),
+    }
+
     class Meta:
         model = Notification
         fields = [
@@ -46,3 +59,4 @@ class NotificationSerializer(serializers.HyperlinkedModelSerializer):
             'created',
             'modified',
         ]
+        expandable_fields = ['action', 'target_slug']
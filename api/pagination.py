@@ -0,0 +1,95 @@
+import base64
+import json
+
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.encoding import force_text
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages through a queryset with an opaque cursor holding the ordering
+    values of the last row served. Every page is an indexed range query,
+    so deep pages cost the same as the first one, and rows inserted while
+    a client scrolls never shift or repeat the pages after it.
+
+    Views may set ``cursor_ordering``; the last field must be unique.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    ordering = ('-created', '-id')
+    page_size = api_settings.PAGINATE_BY
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.page_size = getattr(view, 'paginate_by', None) or self.page_size
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(
+                self.get_keyset_filter(queryset.model, cursor))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.page[-1]))
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(force_text(value))
+        return force_text(base64.urlsafe_b64encode(json.dumps(values)))
+
+    def decode_cursor(self, model, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            fields = [model._meta.get_field(field.lstrip('-'))
+                      for field in self.ordering]
+            if len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value)
+                    for field, value in zip(fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_keyset_filter(self, model, cursor):
+        """
+        Rows strictly after the cursor in ``ordering``, e.g. for
+        ('-created', '-id'): created < c OR (created = c AND id < i).
+        """
+        values = self.decode_cursor(model, cursor)
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            term = Q(**{name + lookup: values[index]})
+            for previous, value in zip(self.ordering[:index], values[:index]):
+                term &= Q(**{previous.lstrip('-'): value})
+            condition = term if index == 0 else condition | term
+        return condition
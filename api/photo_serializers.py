@@ -1,12 +1,34 @@
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from django.utils.crypto import get_random_string
+
 from rest_framework import permissions, serializers, viewsets
 from rest_framework.authentication import (BasicAuthentication,
                                            SessionAuthentication)
 from rest_framework.reverse import reverse
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 
+from accounts.models import MyUser
+from comments.models import Comment, build_tree
 from photos.models import Category, Photo
+from photos.uploads import EXTENSIONS, read_upload
 
 from .comment_serializers import CommentSerializer
+from .mixins import DynamicFieldsMixin, EagerLoadingMixin
+
+
+def prefetch_comments():
+    # every thread in one query, assembled by build_tree; the photo is set
+    # on each comment by the prefetch itself
+    return Prefetch('comment_set', queryset=Comment.objects.threaded(),
+                    to_attr='prefetched_comments')
+
+
+def prefetch_likers():
+    # a stable order, which api.fast reproduces
+    return Prefetch('likers', queryset=MyUser.objects.order_by('pk'))
 
 
 class MyUserUrlField(serializers.HyperlinkedIdentityField):
@@ -37,7 +59,8 @@ class PhotoUrlField(serializers.HyperlinkedIdentityField):
                        request=request, format=format)
 
 
-class PhotoSerializer(serializers.ModelSerializer):
+class PhotoSerializer(DynamicFieldsMixin, EagerLoadingMixin,
+                      serializers.ModelSerializer):
     category_url = CategoryUrlField("category_detail_api")
     photo_url = PhotoUrlField("photo_detail_api")
     creator = serializers.CharField(source='creator.username', read_only=True)
@@ -45,7 +68,23 @@ class PhotoSerializer(serializers.ModelSerializer):
     likers = serializers.HyperlinkedRelatedField(
         many=True, view_name='user_profile_detail_api', read_only=True,
         lookup_field='username')
-    comment_set = CommentSerializer(many=True, read_only=True)
+    comment_set = serializers.SerializerMethodField()
+    thumbnail_url = serializers.CharField(source='get_thumbnail_url',
+                                          read_only=True)
+    feed_url = serializers.CharField(source='get_feed_url', read_only=True)
+    retina_url = serializers.CharField(source='get_retina_url',
+                                       read_only=True)
+
+    select_related_fields = {
+        'category_url': ('category',),
+        'photo_url': ('category',),
+        'creator': ('creator',),
+        'creator_url': ('creator',),
+    }
+    prefetch_related_fields = {
+        'likers': (prefetch_likers,),
+        'comment_set': (prefetch_comments,),
+    }
 
     class Meta:
         model = Photo
@@ -57,6 +96,11 @@ class PhotoSerializer(serializers.ModelSerializer):
             'creator',
             'creator_url',
             'photo',
+            'thumbnail_url',
+            'feed_url',
+            'retina_url',
+            'width',
+            'height',
             'description',
             'like_count',
             'likers',
@@ -64,6 +108,17 @@ class PhotoSerializer(serializers.ModelSerializer):
             'created',
             'modified',
         ]
+        expandable_fields = ['likers', 'comment_set']
+
+    def get_comment_set(self, obj):
+        comments = getattr(obj, 'prefetched_comments', None)
+        if comments is None:
+            comments = Comment.objects.tree_for(obj)
+        else:
+            comments = build_tree(comments)
+        serializer = CommentSerializer(comments, context=self.context,
+                                       many=True, read_only=True)
+        return serializer.data
 
 
 class PhotoViewSet(viewsets.ModelViewSet):
@@ -85,7 +140,51 @@ class PhotoCreateSerializer(serializers.ModelSerializer):
         ]
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class PhotoUploadSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=sorted(EXTENSIONS))
+
+
+class PhotoFinalizeSerializer(serializers.ModelSerializer):
+    upload = serializers.CharField(write_only=True)
+
+    class Meta:
+        model = Photo
+        fields = [
+            'id',
+            'upload',
+            'category',
+            'description',
+        ]
+
+    def validate_upload(self, value):
+        try:
+            key = read_upload(value, user=self.context['request'].user)
+        except signing.BadSignature:
+            raise serializers.ValidationError('Invalid or expired upload.')
+        if not default_storage.exists(key):
+            raise serializers.ValidationError('The file was not uploaded.')
+        if Photo.objects.filter(photo=key).exists():
+            raise serializers.ValidationError('Upload already finalized.')
+        return key
+
+    def validate_category(self, value):
+        if (value.title == 'University' and
+                not self.context['request'].user.edu_email):
+            raise serializers.ValidationError(
+                'A .edu email is required to post to this category.')
+        return value
+
+    def create(self, validated_data):
+        # published by photos.tasks.generate_photo_renditions once verified
+        return Photo.objects.create(
+            photo=validated_data.pop('upload'),
+            creator=self.context['request'].user,
+            slug=get_random_string(length=10),
+            is_active=False,
+            **validated_data)
+
+
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category_url = serializers.HyperlinkedIdentityField('category_detail_api',
                                                         lookup_field='slug')
     photo_set = serializers.SerializerMethodField()
@@ -100,14 +199,31 @@ class CategorySerializer(serializers.ModelSerializer):
             'title',
             'photo_set',
         ]
-
-    def get_photo_set(self, request):
-        queryset = Photo.objects.category_detail(request.pk)
-        serializer = PhotoSerializer(queryset, context=self.context,
+        expandable_fields = ['photo_set']
+
+    def get_photo_set(self, obj):
+        photos = getattr(obj, 'top_photos', None)
+        if photos is None:
+            photos = PhotoSerializer.setup_eager_loading(
+                Photo.objects.category_detail(obj.pk))
+        serializer = PhotoSerializer(photos, context=self.context,
                                      many=True, read_only=True)
         return serializer.data
 
 
+def attach_top_photos(categories):
+    """
+    Sets ``top_photos`` on each of ``categories`` with a constant number of
+    queries however many categories and photos there are.
+    """
+    top = Photo.objects.top_per_category(categories,
+                                         settings.CATEGORY_LIST_PHOTOS)
+    PhotoSerializer.setup_eager_loading(
+        [photo for photos in top.values() for photo in photos])
+    for category in categories:
+        category.top_photos = top[category.pk]
+
+
 class CategoryViewSet(viewsets.ModelViewSet):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
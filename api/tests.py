@@ -1,3 +1,324 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from io import BytesIO
+
+from PIL import Image
+
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from accounts.models import MyUser
+from comments.models import Comment
+from photos.models import Category, Photo
+
+from .comment_serializers import CommentSerializer, get_children_queryset
+from .fast import FastPhotoSerializer
+from .pagination import KeysetPagination
+from .photo_serializers import PhotoSerializer
+from .views import PhotoListAPIView
+
+
+def make_user(username='testuser', email='test@user.com', password='testuser'):
+    return MyUser.objects.create_user(username=username, email=email,
+        password=password)
+
+
+def make_photo(creator, category, slug):
+    photo = Photo.objects.create(creator=creator, category=category,
+        slug=slug, photo='{}/photos/{}.jpg'.format(creator.username, slug))
+    photo.likers.add(creator)
+    parent = Comment.objects.create_comment(user=creator, path='/',
+        text='first', photo=photo)
+    Comment.objects.create_comment(user=creator, path='/', text='reply',
+        photo=photo, parent=parent)
+    return photo
+
+
+class APIQueryCountTest(TestCase):
+    """
+    The number of queries an endpoint runs must not grow with the number
+    of objects it returns.
+    """
+    max_queries = {
+        'photo_list_api': 10,
+        'comment_list_api': 10,
+        'user_profile_list_api': 8,
+        'timeline_api': 12,
+        'category_list_api': 10,
+    }
+
+    def setUp(self):
+        self.client = Client()
+        self.category = Category.objects.create(title='Art', slug='art')
+        self.user = make_user()
+        self.client.login(username='testuser', password='testuser')
+
+    def make_photos(self, count):
+        for i in range(count):
+            username = 'creator{}'.format(Photo.objects.count())
+            creator = make_user(username=username,
+                email='{}@user.com'.format(username))
+            make_photo(creator, self.category, username)
+            make_photo(self.user, self.category, username + '-own')
+
+    def count_queries(self, url_name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertMaxQueries(self, url_name):
+        self.make_photos(2)
+        few = self.count_queries(url_name)
+        self.make_photos(3)
+        many = self.count_queries(url_name)
+
+        self.assertEqual(few, many, "{} ran {} queries for 2 objects but {} "
+            "for 5.".format(url_name, few, many))
+        self.assertLessEqual(many, self.max_queries[url_name], "{} ran {} "
+            "queries, more than the cap of {}.".format(
+                url_name, many, self.max_queries[url_name]))
+
+    def test_photo_list_queries(self):
+        self.assertMaxQueries('photo_list_api')
+
+    def test_comment_list_queries(self):
+        self.assertMaxQueries('comment_list_api')
+
+    def test_user_profile_list_queries(self):
+        self.assertMaxQueries('user_profile_list_api')
+
+    def test_timeline_queries(self):
+        self.assertMaxQueries('timeline_api')
+
+    def test_category_list_queries(self):
+        self.assertMaxQueries('category_list_api')
+
+
+class KeysetPaginationUnitTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.category = Category.objects.create(title='Art', slug='art')
+        self.creator = make_user()
+        for i in range(5):
+            Photo.objects.create(creator=self.creator, category=self.category,
+                slug='photo{}'.format(i), photo='photo{}.jpg'.format(i))
+
+    def paginate(self, cursor=None):
+        pagination = KeysetPagination()
+        pagination.page_size = 2
+        params = {'cursor': cursor} if cursor else {}
+        request = Request(self.factory.get('/photos/', params))
+        page = pagination.paginate_queryset(Photo.objects.all(), request)
+        next_cursor = None
+        if pagination.has_next:
+            next_cursor = pagination.encode_cursor(page[-1])
+        return page, next_cursor
+
+    def test_pages_are_stable_under_inserts(self):
+        expected = list(Photo.objects.order_by('-created', '-id'))
+        first, cursor = self.paginate()
+
+        # a photo posted while the client scrolls must not shift pages
+        Photo.objects.create(creator=self.creator, category=self.category,
+            slug='new', photo='new.jpg')
+
+        second, cursor = self.paginate(cursor)
+        third, cursor = self.paginate(cursor)
+
+        self.assertEqual(first + second + third, expected)
+        self.assertIsNone(cursor, "The last page should have no next "
+            "cursor.")
+
+
+class DirectUploadFunctionalTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.client = Client()
+        self.category = Category.objects.create(title='Art', slug='art')
+        self.user = make_user()
+        self.client.login(username='testuser', password='testuser')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def make_image(self):
+        image = BytesIO()
+        Image.new('RGB', (100, 100)).save(image, 'PNG')
+        return image.getvalue()
+
+    def test_upload_and_finalize(self):
+        ticket = self.client.post(reverse('photo_upload_api'),
+            {'content_type': 'image/png'}).data
+
+        response = self.client.put(ticket['url'], self.make_image(),
+                                   content_type='image/png')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post(reverse('photo_finalize_api'), {
+            'upload': ticket['upload'],
+            'category': self.category.pk,
+        })
+        self.assertEqual(response.status_code, 201)
+        photo = Photo.objects.get(pk=response.data['id'])
+        self.assertEqual(photo.creator, self.user)
+        self.assertTrue(default_storage.exists(photo.photo.name),
+            'The finalized photo should point at the uploaded file.')
+
+    def test_tampered_upload_rejected(self):
+        ticket = self.client.post(reverse('photo_upload_api'),
+            {'content_type': 'image/png'}).data
+
+        response = self.client.put(ticket['url'].replace('/upload/',
+            '/upload/x'), self.make_image(), content_type='image/png')
+        self.assertEqual(response.status_code, 403)
+
+
+class DynamicFieldsFunctionalTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        category = Category.objects.create(title='Art', slug='art')
+        self.user = make_user()
+        make_photo(self.user, category, 'first')
+        self.client.login(username='testuser', password='testuser')
+
+    def get_photo(self, **params):
+        response = self.client.get(reverse('photo_list_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]
+
+    def test_full_representation_by_default(self):
+        photo = self.get_photo()
+        self.assertIn('likers', photo)
+        self.assertIn('comment_set', photo)
+
+    def test_sparse_fields(self):
+        self.assertEqual(sorted(self.get_photo(fields='id,slug')),
+                         ['id', 'slug'])
+
+    def test_listed_expandable_fields_kept(self):
+        self.assertEqual(sorted(self.get_photo(fields='id,likers')),
+                         ['id', 'likers'])
+
+    def test_expand_opts_into_expandable_fields(self):
+        photo = self.get_photo(expand='likers')
+        self.assertIn('likers', photo)
+        self.assertIn('slug', photo)
+        self.assertNotIn('comment_set', photo, 'expandable fields should be '
+            'left out unless expanded.')
+
+
+class CommentChildrenUnitTest(TestCase):
+
+    def test_inactive_replies_left_out(self):
+        category = Category.objects.create(title='Art', slug='art')
+        photo = make_photo(make_user(), category, 'first')
+        parent = Comment.objects.get(photo=photo, parent=None)
+        reply = Comment.objects.get(photo=photo, parent=parent)
+        hidden = Comment.objects.create_comment(user=photo.creator, path='/',
+            text='deleted', photo=photo, parent=parent)
+        Comment.objects.filter(pk=hidden.pk).update(is_active=False)
+
+        parent = CommentSerializer.setup_eager_loading(
+            Comment.objects.filter(pk=parent.pk))[0]
+        self.assertEqual(list(get_children_queryset(parent)), [reply],
+            'the API should hide deleted replies like the HTML thread.')
+
+
+class ConditionalGetFunctionalTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        category = Category.objects.create(title='Art', slug='art')
+        self.user = make_user()
+        self.photo = make_photo(self.user, category, 'first')
+        self.client.login(username='testuser', password='testuser')
+
+    def test_not_modified_until_photos_change(self):
+        url = reverse('photo_list_api')
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # counters are updated without touching ``modified``
+        Photo.objects.filter(pk=self.photo.pk).update(likes_count=5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_category_list_not_modified_until_top_photos_change(self):
+        url = reverse('category_list_api')
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Photo.objects.filter(pk=self.photo.pk).update(likes_count=5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_offsetting_counter_changes_modify_etag(self):
+        category = Category.objects.get(slug='art')
+        other = make_photo(self.user, category, 'second')
+        Photo.objects.filter(pk=self.photo.pk).update(likes_count=0)
+        Photo.objects.filter(pk=other.pk).update(likes_count=1)
+        url = reverse('photo_list_api')
+        etag = self.client.get(url)['ETag']
+
+        # a like on one photo and an unlike on another
+        Photo.objects.filter(pk=self.photo.pk).update(likes_count=1)
+        Photo.objects.filter(pk=other.pk).update(likes_count=0)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class FastPhotoSerializerUnitTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        category = Category.objects.create(title='Art', slug='art')
+        creator = make_user()
+        # a username outside the URL templates' fast path
+        liker = make_user(username='first.last', email='first@last.com')
+        for slug in ('first', 'second'):
+            make_photo(creator, category, slug).likers.add(liker)
+        Photo.objects.create(creator=creator, category=category,
+            slug='bare', photo='bare.jpg', description=u'caf\xe9 #art')
+
+    def render_both(self, **params):
+        request = Request(self.factory.get('/api/photos/', params))
+        queryset = PhotoSerializer.setup_eager_loading(
+            Photo.objects.order_by('pk'),
+            fields=PhotoSerializer.get_selected_fields(request))
+        # the view, so that the serializer honors the parameters
+        context = {'request': request, 'view': PhotoListAPIView()}
+        slow = PhotoSerializer(queryset, many=True, context=context).data
+        fast = FastPhotoSerializer(request).serialize(
+            list(Photo.objects.order_by('pk').values_list('pk', flat=True)))
+        renderer = JSONRenderer()
+        return renderer.render(slow), renderer.render(fast)
+
+    def test_renders_identical_json(self):
+        slow, fast = self.render_both()
+        self.assertEqual(slow, fast)
+
+    def test_renders_identical_sparse_json(self):
+        slow, fast = self.render_both(fields='id,photo_url,created',
+                                      expand='likers')
+        self.assertEqual(slow, fast)
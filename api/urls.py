@@ -1,13 +1,14 @@
 from django.conf.urls import patterns, url
 
 from .views import (AccountCreateAPIView, FollowerListAPIView, HomepageAPIView,
-                    MyUserDetailAPIView, MyUserListAPIView)
+                    MyUserDetailAPIView, MyUserListAPIView,
+                    MyUserPhotoListAPIView)
 from .views import (CommentCreateAPIView, CommentDetailAPIView,
                     CommentListAPIView)
 from .views import HashtagListAPIView
 from .views import (CategoryDetailAPIView, CategoryListAPIView,
                     PhotoListAPIView, PhotoCreateAPIView, PhotoDetailAPIView,
-                    TimelineAPIView)
+                    PhotoFinalizeAPIView, PhotoUploadAPIView, TimelineAPIView)
 from .views import NotificationAPIView
 
 
@@ -38,12 +39,18 @@ urlpatterns = patterns('',
         name='photo_list_api'),
     url(r'^photo/create/$', PhotoCreateAPIView.as_view(),
         name='photo_create_api'),
+    url(r'^photo/upload/$', PhotoUploadAPIView.as_view(),
+        name='photo_upload_api'),
+    url(r'^photo/finalize/$', PhotoFinalizeAPIView.as_view(),
+        name='photo_finalize_api'),
     url(r'^photo/(?P<cat_slug>[\w-]+)/(?P<photo_slug>[\w-]+)/$',
         PhotoDetailAPIView.as_view(), name='photo_detail_api'),
     url(r'^profiles/$', MyUserListAPIView.as_view(),
         name='user_profile_list_api'),
     url(r'^profiles/(?P<username>[\w.@+-]+)/$', MyUserDetailAPIView.as_view(),
         name='user_profile_detail_api'),
+    url(r'^profiles/(?P<username>[\w.@+-]+)/photos/$',
+        MyUserPhotoListAPIView.as_view(), name='user_photo_list_api'),
     url(r'^timeline/$', TimelineAPIView.as_view(),
         name='timeline_api'),
 )
@@ -1,35 +1,59 @@
 from django.db.models import Count
 from django.shortcuts import get_object_or_404
 
-from rest_framework import generics, mixins, permissions
+from rest_framework import generics, mixins, permissions, status
 from rest_framework.authentication import (BasicAuthentication,
                                            SessionAuthentication)
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 
 from accounts.models import Follower, MyUser
+from core.conditional import (aggregate_state, FOLLOWER_COUNTERS,
+                              PHOTO_COUNTERS, row_state)
 from comments.models import Comment
 from hashtags.models import Hashtag
 from notifications.models import Notification
-from photos.models import Category, Photo
+from photos.models import Category, Photo, TimelineEntry
+from photos.uploads import create_ticket
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response as RestResponse
 from rest_framework.reverse import reverse as api_reverse
 
 from .account_serializers import (AccountCreateSerializer, FollowerSerializer,
-                                  MyUserSerializer)
+                                  MyUserSerializer, MyUserSummarySerializer)
 from .comment_serializers import (CommentCreateSerializer, CommentSerializer,
                                   CommentUpdateSerializer)
+from .fast import FastListMixin
 from .hashtag_serializers import HashtagSerializer
+from .mixins import ConditionalGetMixin, EagerLoadingAPIViewMixin
+from .pagination import KeysetPagination
 from .notification_serializers import NotificationSerializer
 from .permissions import (IsCreatorOrReadOnly, IsOwnerOrReadOnly,
                           MyUserIsOwnerOrReadOnly)
-from .photo_serializers import (CategorySerializer, PhotoCreateSerializer,
-                                PhotoSerializer)
+from .photo_serializers import (attach_top_photos, CategorySerializer,
+                                PhotoCreateSerializer, PhotoFinalizeSerializer,
+                                PhotoSerializer, PhotoUploadSerializer)
 
 # Create your views here.
 
 
+def comments_state(photo_pks):
+    # comments are embedded in the photos; edits leave the counters alone
+    return aggregate_state(Comment.objects.filter(photo__in=photo_pks))
+
+
+def photo_state(photos):
+    """
+    The state of ``photos`` loaded by ``PhotoSerializer.setup_eager_loading``,
+    read from the comments prefetched with them.
+    """
+    return [(photo.pk, photo.modified, photo.likes_count,
+             photo.comments_count,
+             [(comment.pk, comment.modified) for comment
+              in getattr(photo, 'prefetched_comments', ())])
+            for photo in photos]
+
+
 @api_view(['GET'])
 def api_home(request):
     data = {
@@ -71,21 +95,41 @@ class AccountCreateAPIView(generics.CreateAPIView):
     serializer_class = AccountCreateSerializer
 
 
-class MyUserListAPIView(generics.ListAPIView):
+class MyUserListAPIView(ConditionalGetMixin, EagerLoadingAPIViewMixin,
+                        generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = MyUserSerializer
+    serializer_class = MyUserSummarySerializer
     queryset = MyUser.objects.all()
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-date_joined', '-id')
     paginate_by = 250
 
+    def get_page_state(self, page):
+        pks = [user.pk for user in page]
+        return (super(MyUserListAPIView, self).get_page_state(page),
+                row_state(Follower.objects.filter(user__in=pks),
+                          FOLLOWER_COUNTERS),
+                aggregate_state(Photo.objects.filter(creator__in=pks,
+                                                     is_active=True)))
 
-class MyUserDetailAPIView(generics.RetrieveAPIView,
+
+class MyUserDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView,
                           mixins.DestroyModelMixin,
                           mixins.UpdateModelMixin):
     permission_classes = [MyUserIsOwnerOrReadOnly]
     serializer_class = MyUserSerializer
 
+    def get_state(self):
+        username = self.kwargs["username"]
+        photos = row_state(Photo.objects.filter(creator__username=username),
+                           ('modified',) + PHOTO_COUNTERS)
+        return (row_state(MyUser.objects.filter(username=username)),
+                row_state(Follower.objects.filter(user__username=username),
+                          FOLLOWER_COUNTERS),
+                photos, comments_state([row[0] for row in photos]))
+
     def get_object(self):
         username = self.kwargs["username"]
         obj = get_object_or_404(MyUser, username=username)
@@ -98,6 +142,19 @@ class MyUserDetailAPIView(generics.RetrieveAPIView,
         return self.update(request, *args, **kwargs)
 
 
+class MyUserPhotoListAPIView(EagerLoadingAPIViewMixin, generics.ListAPIView):
+    authentication_classes = [SessionAuthentication, BasicAuthentication,
+                              JSONWebTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = PhotoSerializer
+    pagination_class = KeysetPagination
+    paginate_by = 50
+
+    def get_queryset(self):
+        user = get_object_or_404(MyUser, username=self.kwargs["username"])
+        return Photo.objects.own(user).filter(is_active=True)
+
+
 class FollowerListAPIView(generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
@@ -106,7 +163,8 @@ class FollowerListAPIView(generics.ListAPIView):
     queryset = Follower.objects.all()
 
 
-class HomepageAPIView(generics.ListAPIView):
+class HomepageAPIView(FastListMixin, EagerLoadingAPIViewMixin,
+                      generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     serializer_class = PhotoSerializer
@@ -121,14 +179,22 @@ class CommentCreateAPIView(generics.CreateAPIView):
     serializer_class = CommentCreateSerializer
 
 
-class CommentListAPIView(generics.ListAPIView):
+class CommentListAPIView(ConditionalGetMixin, EagerLoadingAPIViewMixin,
+                         generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CommentSerializer
     queryset = Comment.objects.all()
+    pagination_class = KeysetPagination
     paginate_by = 150
 
+    def get_page_state(self, page):
+        # replies are listed with their parent
+        return (super(CommentListAPIView, self).get_page_state(page),
+                [(child.pk, child.modified) for comment in page
+                 for child in getattr(comment, 'prefetched_children', ())])
+
 
 class CommentDetailAPIView(mixins.DestroyModelMixin, generics.RetrieveAPIView):
     lookup_field = 'id'
@@ -150,16 +216,24 @@ class HashtagListAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = HashtagSerializer
     queryset = Hashtag.objects.all()
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-id',)
     paginate_by = 250
 
 
 # N O T I F I C A T I O N S
-class NotificationAPIView(generics.ListAPIView):
+class NotificationAPIView(ConditionalGetMixin, EagerLoadingAPIViewMixin,
+                          generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Notification.objects.all()
+    pagination_class = KeysetPagination
+    # marking read is a bulk update that leaves ``modified`` alone
+    state_fields = ('modified', 'read')
+
+    def get_queryset(self):
+        return Notification.objects.filter(recipient=self.request.user)
 
 
 # P H O T O S
@@ -167,21 +241,60 @@ class PhotoCreateAPIView(generics.CreateAPIView):
     serializer_class = PhotoCreateSerializer
 
 
-class PhotoListAPIView(generics.ListAPIView):
+class PhotoUploadAPIView(generics.GenericAPIView):
+    """
+    Returns a ticket to upload a photo straight to storage; the upload is
+    then registered with ``PhotoFinalizeAPIView``.
+    """
+    authentication_classes = [SessionAuthentication, BasicAuthentication,
+                              JSONWebTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = PhotoUploadSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ticket = create_ticket(request.user,
+                               serializer.validated_data['content_type'],
+                               request=request)
+        return RestResponse(ticket, status=status.HTTP_201_CREATED)
+
+
+class PhotoFinalizeAPIView(generics.CreateAPIView):
+    authentication_classes = [SessionAuthentication, BasicAuthentication,
+                              JSONWebTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = PhotoFinalizeSerializer
+
+
+class PhotoListAPIView(ConditionalGetMixin, FastListMixin,
+                       EagerLoadingAPIViewMixin, generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PhotoSerializer
     queryset = Photo.objects.all()
+    pagination_class = KeysetPagination
     paginate_by = 250
+    state_fields = ('modified',) + PHOTO_COUNTERS
 
+    def get_page_state(self, page):
+        return (super(PhotoListAPIView, self).get_page_state(page),
+                comments_state([photo.pk for photo in page]))
 
-class PhotoDetailAPIView(generics.RetrieveAPIView,
+
+class PhotoDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView,
                          mixins.DestroyModelMixin,
                          mixins.UpdateModelMixin):
     permission_classes = [permissions.IsAuthenticated, IsCreatorOrReadOnly]
     serializer_class = PhotoSerializer
 
+    def get_state(self):
+        photos = row_state(Photo.objects.filter(
+            category__slug=self.kwargs["cat_slug"],
+            slug=self.kwargs["photo_slug"]), ('modified',) + PHOTO_COUNTERS)
+        return photos, comments_state([row[0] for row in photos])
+
     def get_object(self):
         cat_slug = self.kwargs["cat_slug"]
         photo_slug = self.kwargs["photo_slug"]
@@ -196,7 +309,7 @@ class PhotoDetailAPIView(generics.RetrieveAPIView,
         return self.update(request, *args, **kwargs)
 
 
-class CategoryListAPIView(generics.ListAPIView):
+class CategoryListAPIView(ConditionalGetMixin, generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     serializer_class = CategorySerializer
@@ -207,8 +320,32 @@ class CategoryListAPIView(generics.ListAPIView):
             the_count=(Count('photo'))).filter(
                 is_active=True).order_by('-the_count')
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        categories = list(page if page is not None else queryset)
+        if page is None:
+            self.attach_top_photos(categories)
+
+        serializer = self.get_serializer(categories, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return RestResponse(serializer.data)
+
+    def attach_top_photos(self, categories):
+        fields = self.get_serializer_class().get_selected_fields(self.request)
+        if fields is None or 'photo_set' in fields:
+            attach_top_photos(categories)
+
+    def get_page_state(self, page):
+        # the top photos are loaded here so that the ETag covers them
+        self.attach_top_photos(page)
+        return (super(CategoryListAPIView, self).get_page_state(page),
+                [photo_state(getattr(category, 'top_photos', ()))
+                 for category in page])
 
-class CategoryDetailAPIView(generics.RetrieveAPIView):
+
+class CategoryDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     serializer_class = CategorySerializer
@@ -219,14 +356,34 @@ class CategoryDetailAPIView(generics.RetrieveAPIView):
         obj = get_object_or_404(Category, slug=slug)
         return obj
 
+    def retrieve(self, request, *args, **kwargs):
+        category = self.get_object()
+        photos = []
+        fields = self.get_serializer_class().get_selected_fields(request)
+        if fields is None or 'photo_set' in fields:
+            photos = list(PhotoSerializer.setup_eager_loading(
+                Photo.objects.category_detail(category)))
+            category.top_photos = photos
+        # built from the photos about to be serialized
+        self.check_not_modified((category.pk, category.modified,
+                                 photo_state(photos)))
+
+        serializer = self.get_serializer(category)
+        return RestResponse(serializer.data)
+
 
-class TimelineAPIView(generics.ListAPIView):
+class TimelineAPIView(ConditionalGetMixin, FastListMixin,
+                      EagerLoadingAPIViewMixin, generics.ListAPIView):
     authentication_classes = [SessionAuthentication, BasicAuthentication,
                               JSONWebTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PhotoSerializer
 
+    state_fields = ('modified',) + PHOTO_COUNTERS
+
     def get_queryset(self):
-        photos_self = Photo.objects.own(self.request.user)
-        photos_following = Photo.objects.following(self.request.user)
-        return (photos_self | photos_following).distinct()
+        return TimelineEntry.objects.photos_for(self.request.user)
+
+    def get_page_state(self, page):
+        return (super(TimelineAPIView, self).get_page_state(page),
+                comments_state([photo.pk for photo in page]))
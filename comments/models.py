@@ -10,11 +10,50 @@ from photos.models import Photo
 # Create your models here.
 
 
+def build_tree(comments):
+    """
+    Assembles ``comments``, ordered oldest first, into threads: returns
+    the top level comments, each with its replies in ``tree_children``.
+    Replies whose parent isn't among ``comments`` are left out.
+    """
+    by_pk = {}
+    roots = []
+    for comment in comments:
+        comment.tree_children = []
+        by_pk[comment.pk] = comment
+
+    for comment in comments:
+        if comment.parent_id is None:
+            roots.append(comment)
+        elif comment.parent_id in by_pk:
+            parent = by_pk[comment.parent_id]
+            comment.parent = parent
+            parent.tree_children.append(comment)
+    return roots
+
+
 class CommentManager(models.Manager):
     def all(self):
         return super(CommentManager, self).filter(is_active=True).filter(
             parent=None)
 
+    def threaded(self):
+        """
+        Active comments with their users, oldest first: what threads show,
+        whether built by ``build_tree`` or prefetched.
+        """
+        return super(CommentManager, self).get_queryset().filter(
+            is_active=True).select_related('user').order_by('created', 'id')
+
+    def tree_for(self, photo):
+        """
+        Every active comment thread of ``photo`` loaded with one query.
+        """
+        comments = list(self.threaded().filter(photo=photo))
+        for comment in comments:
+            comment.photo = photo
+        return build_tree(comments)
+
     def create_comment(self, user=None, text=None, path=None,
                        photo=None, parent=None):
         if not path:
@@ -47,11 +86,13 @@ class Comment(HashtagMixin, TimeStampedModel):
         help_text='Contains the description with hashtags replaced with links')
 
     hashtag_text_field = 'text'
+    hashtag_html_field = 'hashtag_enabled_text'
 
     objects = CommentManager()
 
     class Meta:
         app_label = 'comments'
+        index_together = [['created', 'id']]
         ordering = ['created']
 
     def __unicode__(self):
@@ -66,25 +107,27 @@ class Comment(HashtagMixin, TimeStampedModel):
         the children, in effect, are the affected users.
         """
         comment_children = self.get_children()
-        if comment_children is not None:
+        if comment_children:
             users = []
             for comment in comment_children:
-                if comment.user in users:
-                    pass
-                else:
+                if comment.user not in users:
                     users.append(comment.user)
-                    return users
+            return users
         return None
 
     def get_children(self):
         if self.is_child:
             return None
+        elif hasattr(self, 'tree_children'):
+            return self.tree_children
         else:
-            return Comment.objects.filter(parent=self)
+            return Comment.objects.filter(parent=self).select_related('user')
 
     def get_children_count(self):
         if self.is_child:
             return None
+        elif hasattr(self, 'tree_children'):
+            return len(self.tree_children)
         else:
             return Comment.objects.filter(parent=self).count()
 
@@ -102,4 +145,4 @@ class Comment(HashtagMixin, TimeStampedModel):
 
     @property
     def is_child(self):
-        return self.parent is not None
+        return self.parent_id is not None
@@ -1,23 +1,32 @@
-from django.core.cache import cache
-from django.db.models.signals import post_save, pre_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.template.loader import render_to_string
+
+from core.cache import invalidate
+from photos.models import Photo
 
 from .models import Comment
 
 
 @receiver(post_save, sender=Comment)
-def clear_cache(sender, instance, created, **kwargs):
-    cache._cache.flush_all()
+def invalidate_cache(sender, instance, created, **kwargs):
+    invalidate(instance, instance.photo, instance.parent)
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_deleted(sender, instance, **kwargs):
+    invalidate(instance, instance.photo, instance.parent)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        Photo.objects.filter(pk=instance.photo_id).update(
+            comments_count=F('comments_count') + 1)
 
 
-@receiver(pre_save, sender=Comment)
-def process_hashtags(sender, instance, **kwargs):
-    html = []
-    for word in instance.hashtag_field.value_to_string(instance).split():
-        if word.startswith('#'):
-            word = render_to_string('hashtags/_link.html',
-                                    {'hashtag': word.lower()[1:]})
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    Photo.objects.filter(pk=instance.photo_id).update(
+        comments_count=F('comments_count') - 1)
 
-        html.append(word)
-        instance.hashtag_enabled_text = ' '.join(html)
@@ -1,3 +1,42 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from accounts.models import MyUser
+from photos.models import Category, Photo
+from .models import Comment
+
+
+def make_user(username='testuser', email='test@user.com', password='testuser'):
+    return MyUser.objects.create_user(username=username, email=email,
+        password=password)
+
+
+class CommentTreeUnitTest(TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user(username='other', email='o@user.com')
+        category = Category.objects.create(title='Art', slug='art')
+        self.photo = Photo.objects.create(creator=self.user,
+            category=category, slug='first', photo='first.jpg')
+        self.parent = Comment.objects.create_comment(user=self.user,
+            path='/', text='first', photo=self.photo)
+        for user in (self.user, self.other, self.other):
+            Comment.objects.create_comment(user=user, path='/', text='reply',
+                photo=self.photo, parent=self.parent)
+        Comment.objects.create_comment(user=self.other, path='/',
+            text='second', photo=self.photo)
+
+    def test_tree_loaded_in_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            roots = Comment.objects.tree_for(self.photo)
+            counts = [len(root.get_children()) for root in roots]
+            [child.user.username for child in roots[0].get_children()]
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(counts, [3, 0])
+
+    def test_affected_users_are_all_distinct_repliers(self):
+        self.assertEqual(self.parent.get_affected_users(),
+            [self.user, self.other], "Every user who replied should be "
+            "affected, once.")
@@ -2,9 +2,9 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import (get_object_or_404,
                               HttpResponseRedirect, render)
-from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
 
+from core.cache import cache_page_depends, depends_on
 from notifications.signals import notify
 from photos.models import Category, Photo
 
@@ -15,14 +15,13 @@ from .models import Comment
 
 
 @login_required
-@cache_page(60 * 4)
+@cache_page_depends(60 * 4)
 def comments_all(request, cat_slug, photo_slug):
     category = get_object_or_404(Category, slug=cat_slug)
     photo = get_object_or_404(Photo, category=category, slug=photo_slug)
+    depends_on(request, photo)
     comment_form = CommentForm()
-    comments = photo.comment_set.all()
-    for c in comments:
-        c.get_children()
+    comments = Comment.objects.tree_for(photo)
 
     context = {
         "comments": comments,
@@ -33,9 +32,10 @@ def comments_all(request, cat_slug, photo_slug):
 
 
 @login_required
-@cache_page(60 * 4)
+@cache_page_depends(60 * 4)
 def comment_thread(request, id):
     comment = get_object_or_404(Comment, id=id)
+    depends_on(request, comment)
     form = CommentForm()
 
     context = {
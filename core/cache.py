@@ -0,0 +1,140 @@
+"""
+Dependency tracked caching.
+
+Cached pages and fragments register the model instances they were built
+from; saving one of those instances evicts only the entries that depend
+on it instead of flushing the whole cache.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+from django.utils import six
+from django.utils.cache import get_cache_key
+from django.utils.decorators import available_attrs
+from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_cookie
+
+
+TAG_KEY = 'cache-tags:{}'
+# a tag's keys are stored one per slot, numbered by an atomic counter,
+# so concurrent registrations never overwrite each other
+SLOT_KEY = '{}:{}'
+TAG_TIMEOUT = 60 * 60
+
+
+def make_tag(obj, pk=None):
+    """
+    Returns the tag of a model instance (``app_label.model:pk``), or of
+    a whole model when given a class. Passing ``pk`` builds an instance
+    tag without having to load the instance.
+    """
+    if isinstance(obj, six.string_types):
+        return obj
+
+    label = '{}.{}'.format(obj._meta.app_label, obj._meta.model_name)
+    if isinstance(obj, Model):
+        pk = obj.pk
+    if pk is not None:
+        return '{}:{}'.format(label, pk)
+    return label
+
+
+def _tag_keys(objs):
+    return set(TAG_KEY.format(make_tag(obj)) for obj in objs
+               if obj is not None)
+
+
+def _next_slot(tag_key):
+    cache.add(tag_key, 0, TAG_TIMEOUT)
+    try:
+        return cache.incr(tag_key)
+    except ValueError:
+        # evicted between the add and the incr
+        cache.add(tag_key, 0, TAG_TIMEOUT)
+        return cache.incr(tag_key)
+
+
+def register(key, *objs):
+    """
+    Records that the cache entry ``key`` depends on ``objs``.
+    """
+    tag_keys = _tag_keys(objs)
+    if not tag_keys:
+        return
+
+    cache.set_many(dict(
+        (SLOT_KEY.format(tag_key, _next_slot(tag_key)), key)
+        for tag_key in tag_keys
+    ), TAG_TIMEOUT)
+
+
+def invalidate(*objs):
+    """
+    Deletes every cache entry registered against ``objs``.
+    """
+    tag_keys = _tag_keys(objs)
+    if not tag_keys:
+        return
+
+    slot_keys = set()
+    for tag_key, count in cache.get_many(tag_keys).items():
+        slot_keys.update(SLOT_KEY.format(tag_key, slot)
+                         for slot in range(1, count + 1))
+    keys = set(tag_keys) | slot_keys
+    keys.update(cache.get_many(slot_keys).values())
+    cache.delete_many(keys)
+
+
+def get_tags(objs):
+    """
+    Returns the tags of ``objs``, which can be stored along with a cached
+    response and registered again wherever it is stored.
+    """
+    return [make_tag(obj) for obj in objs if obj is not None]
+
+
+def depends_on(request, *objs):
+    """
+    Declares the model instances the page being rendered for ``request``
+    is built from. Used together with ``cache_page_depends``.
+    """
+    if hasattr(request, '_cache_dependencies'):
+        request._cache_dependencies.extend(objs)
+
+
+def cache_page_depends(timeout):
+    """
+    Like ``cache_page``, but the cached page is registered against the
+    instances the view passed to ``depends_on`` so that saving any of
+    them evicts it. The tags travel with the response as ``_cache_tags``
+    so the page cache middleware registers the copy it stores too.
+
+    Pages vary on the cookie, since they render per-viewer state.
+    """
+    def decorator(view_func):
+        def tracked_view(request, *args, **kwargs):
+            request._cache_dependencies = []
+            response = view_func(request, *args, **kwargs)
+            response._cache_tags = get_tags(request._cache_dependencies)
+            return response
+
+        # vary before ``cache_page`` learns the key, which it does before
+        # the session middleware gets to add the header
+        cached_view = cache_page(
+            timeout, key_prefix=settings.CACHE_VIEW_KEY_PREFIX)(
+                vary_on_cookie(tracked_view))
+
+        @wraps(view_func, assigned=available_attrs(view_func))
+        def _wrapped_view(request, *args, **kwargs):
+            response = cached_view(request, *args, **kwargs)
+            # only set when the view actually ran, i.e. on a cache miss
+            if getattr(request, '_cache_dependencies', None):
+                key = get_cache_key(request, settings.CACHE_VIEW_KEY_PREFIX,
+                                    'GET', cache=cache)
+                if key is not None:
+                    register(key, *response._cache_tags)
+            return response
+        return _wrapped_view
+    return decorator
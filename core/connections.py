@@ -0,0 +1,19 @@
+from __future__ import absolute_import
+
+import redis
+
+from django.conf import settings
+
+
+_connection = None
+
+
+def get_redis_connection():
+    """
+    Returns the process wide Redis client for ``settings.REDIS_URL``. The
+    client pools its own connections, so it is safe to share.
+    """
+    global _connection
+    if _connection is None:
+        _connection = redis.StrictRedis.from_url(settings.REDIS_URL)
+    return _connection
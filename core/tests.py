@@ -1,3 +1,72 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from accounts.models import MyUser
+from .cache import cache_page_depends, invalidate, make_tag, register
+
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheDependencyUnitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_make_tag(self):
+        self.assertEqual(make_tag(MyUser), 'accounts.myuser')
+        self.assertEqual(make_tag(MyUser, pk=3), 'accounts.myuser:3')
+        self.assertEqual(make_tag(MyUser(pk=4)), 'accounts.myuser:4')
+
+    def test_invalidate_only_evicts_dependent_keys(self):
+        cache.set('page-a', 'a')
+        cache.set('page-b', 'b')
+        register('page-a', make_tag(MyUser, pk=1))
+        register('page-b', make_tag(MyUser, pk=2))
+
+        invalidate(MyUser(pk=1))
+
+        self.assertIsNone(cache.get('page-a'), "Entries depending on the "
+            "saved instance should be evicted.")
+        self.assertEqual(cache.get('page-b'), 'b', "Entries depending on "
+            "other instances should survive.")
+
+    def test_invalidate_evicts_every_key_of_a_tag(self):
+        cache.set('page-a', 'a')
+        cache.set('page-b', 'b')
+        # e.g. the view cache and the page cache middleware copies
+        register('page-a', make_tag(MyUser, pk=1))
+        register('page-b', make_tag(MyUser, pk=1))
+
+        invalidate(MyUser(pk=1))
+
+        self.assertEqual(cache.get_many(['page-a', 'page-b']), {})
+
+
+@cache_page_depends(60)
+def viewer_page(request):
+    return HttpResponse(request.COOKIES.get('sessionid', ''))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachePageDependsUnitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def get(self, session):
+        request = self.factory.get('/page/', HTTP_COOKIE='sessionid={}'.format(
+            session))
+        return viewer_page(request).content
+
+    def test_pages_not_shared_between_viewers(self):
+        self.assertEqual(self.get('a'), b'a')
+        self.assertEqual(self.get('b'), b'b', "One viewer's page was served "
+            "to another.")
@@ -8,3 +8,14 @@ def numCPUs():
 
 bind = "127.0.0.1:8000"
 workers = numCPUs() * 2 + 1
+
+# gevent workers so clients holding the notification stream open don't
+# tie up a worker each
+worker_class = "gevent"
+worker_connections = 1000
+
+
+def post_fork(server, worker):
+    # make psycopg2 cooperate with gevent instead of blocking the worker
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
@@ -6,6 +6,6 @@ from .models import Hashtag
 
 
 class HashtagAdmin(admin.ModelAdmin):
-    list_display = ('tag',)
+    list_display = ('tag', 'usage_count',)
 
 admin.site.register(Hashtag, HashtagAdmin)
@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hashtags.models import HashtagMixin
+from hashtags.rendering import render_links
+
+
+class Command(BaseCommand):
+    help = ('Renders the hashtag links of every photo and comment again, '
+            'e.g. after the link markup changed.')
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            if not (issubclass(model, HashtagMixin) and
+                    model.hashtag_html_field):
+                continue
+
+            rows = model._default_manager.values_list(
+                'pk', model.hashtag_text_field, model.hashtag_html_field)
+            updated = 0
+            with transaction.atomic():
+                for pk, text, html in rows.iterator():
+                    rendered = render_links(text)
+                    if rendered != html:
+                        model._default_manager.filter(pk=pk).update(
+                            **{model.hashtag_html_field: rendered})
+                        updated += 1
+            self.stdout.write('Updated {} {}.'.format(
+                updated, model._meta.verbose_name_plural))
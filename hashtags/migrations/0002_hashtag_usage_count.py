@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def count_usage(apps, schema_editor):
+    Hashtag = apps.get_model('hashtags', 'Hashtag')
+    for hashtag in Hashtag.objects.all():
+        usage_count = hashtag.photo_set.count() + hashtag.comment_set.count()
+        Hashtag.objects.filter(pk=hashtag.pk).update(usage_count=usage_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hashtags', '0001_initial'),
+        ('photos', '0008_photo_created_index'),
+        ('comments', '0006_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hashtag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False, db_index=True),
+        ),
+        migrations.RunPython(count_usage, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,65 @@
 from django.core.urlresolvers import reverse
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
+from django.db.models.signals import class_prepared, pre_delete
+
+from core.cache import invalidate, make_tag
+from .rendering import get_hashtags, render_links
 
 # Create your models here.
 
 
+class HashtagManager(models.Manager):
+    def get_or_create_many(self, tags):
+        """
+        Returns the hashtags for ``tags``, creating the missing ones with a
+        single insert instead of one ``get_or_create`` per tag.
+        """
+        tags = set(tags)
+        if not tags:
+            return []
+
+        existing = set(self.filter(tag__in=tags).values_list('tag', flat=True))
+        missing = tags - existing
+        if missing:
+            try:
+                with transaction.atomic():
+                    self.bulk_create([self.model(tag=tag) for tag in missing])
+            except IntegrityError:
+                # another request created some of them in the meantime
+                for tag in missing:
+                    self.get_or_create(tag=tag)
+        return list(self.filter(tag__in=tags))
+
+    def update_usage(self, pks, delta):
+        if pks:
+            self.filter(pk__in=pks).update(
+                usage_count=F('usage_count') + delta)
+
+    def reconcile_counters(self):
+        """
+        Resets ``usage_count`` on every hashtag whose counter drifted from
+        the photos and comments tagged with it. Returns the number of
+        counters fixed.
+        """
+        fixed = 0
+        counts = self.annotate(
+            the_photos=Count('photo', distinct=True),
+            the_comments=Count('comment', distinct=True)).values_list(
+                'pk', 'usage_count', 'the_photos', 'the_comments')
+        for pk, usage_count, photos, comments in counts:
+            if usage_count != photos + comments:
+                self.filter(pk=pk).update(usage_count=photos + comments)
+                fixed += 1
+        return fixed
+
+
 class Hashtag(models.Model):
     tag = models.SlugField(max_length=250, unique=True)
+    usage_count = models.PositiveIntegerField(default=0, db_index=True,
+                                              editable=False)
+
+    objects = HashtagManager()
 
     class Meta:
         app_label = 'hashtags'
@@ -14,12 +68,14 @@ class Hashtag(models.Model):
         return self.tag
 
     def get_absolute_url(self):
-        return reverse('hashtag_detail', kwargs={'hashtag': str(self.tag)})
+        return reverse('hashtagged_item_list', kwargs={'tag': str(self.tag)})
 
 
 class HashtagMixin(models.Model):
     hashtags = models.ManyToManyField(Hashtag, blank=True)
     hashtag_text_field = None
+    # optional field holding the text rendered with its hashtags linked
+    hashtag_html_field = None
 
     class Meta:
         abstract = True
@@ -40,29 +96,74 @@ class HashtagMixin(models.Model):
             raise Exception(u'"hashtag_text_field" must be of type: '
                 u'models.CharField or TextField.')
 
-    def _get_hashtags(self):
-        # split the string if the word starts with '#'
-        return [str(word[1:]) for word in self.hashtag_field.value_to_string(
-            self).split() if word.startswith('#')]
+        # the source text as loaded, so saves that leave it alone skip the
+        # hashtag work; None when the field was deferred
+        self._hashtag_source = self.__dict__.get(self.hashtag_field.attname)
 
-    def _delete_hashtags(self):
-        # remove any previously set tags for the instance
-        self.hashtags.clear()
-        self.hashtags.all().delete()
+    def _get_hashtag_source(self):
+        return getattr(self, self.hashtag_field.attname)
 
-    def _set_hashtags(self):
-        self._delete_hashtags()
+    def _hashtag_source_changed(self, update_fields=None):
+        if self._state.adding:
+            return True
+        if (update_fields is not None and
+                self.hashtag_text_field not in update_fields):
+            return False
+        return self._get_hashtag_source() != self._hashtag_source
+
+    def _get_hashtags(self):
+        return get_hashtags(self._get_hashtag_source())
 
-        # add any hashtags derived from the hashtag_text_field
-        # makes all tags lowercase
-        hashtags = []
-        for tag in self._get_hashtags():
-            hashtag, created = Hashtag.objects.get_or_create(
-                tag=tag.lower(), defaults={'tag': tag.lower()})
-            hashtags.append(hashtag)
+    def render_hashtags(self):
+        return render_links(self._get_hashtag_source())
 
-        self.hashtags.add(*hashtags)
+    def _set_hashtags(self):
+        # only touch the tags that were added or removed since the last
+        # save; makes all tags lowercase
+        tags = set(tag.lower() for tag in self._get_hashtags() if tag)
+        current = dict(self.hashtags.values_list('tag', 'pk'))
+
+        removed = [pk for tag, pk in current.items() if tag not in tags]
+        if removed:
+            self.hashtags.remove(*removed)
+            Hashtag.objects.update_usage(removed, -1)
+
+        added = []
+        if tags.difference(current):
+            added = [hashtag.pk for hashtag in Hashtag.objects.get_or_create_many(
+                tags.difference(current))]
+            self.hashtags.add(*added)
+            Hashtag.objects.update_usage(added, 1)
+
+        # evict the hashtag pages of the tags that changed
+        invalidate(*[make_tag(Hashtag, pk) for pk in removed + added])
 
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        changed = self._hashtag_source_changed(update_fields)
+        if changed and self.hashtag_html_field:
+            setattr(self, self.hashtag_html_field, self.render_hashtags())
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(
+                    [self.hashtag_html_field])
+
         super(HashtagMixin, self).save(*args, **kwargs)
-        self._set_hashtags()
+
+        if changed:
+            self._set_hashtags()
+            self._hashtag_source = self._get_hashtag_source()
+
+
+def release_hashtags(sender, instance, **kwargs):
+    # pre_delete also runs for cascades and queryset deletes, which skip
+    # ``Model.delete()``, while the hashtag relations still exist
+    Hashtag.objects.update_usage(
+        list(instance.hashtags.values_list('pk', flat=True)), -1)
+
+
+def connect_hashtag_models(sender, **kwargs):
+    if issubclass(sender, HashtagMixin) and not sender._meta.abstract:
+        pre_delete.connect(release_hashtags, sender=sender)
+
+
+class_prepared.connect(connect_hashtag_models)
@@ -0,0 +1,52 @@
+"""
+Turns the hashtags and @mentions of user text into links in a single pass
+over the text, escaping everything else.
+"""
+import re
+
+from django.core.urlresolvers import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+TOKEN_RE = re.compile(
+    r'(?<!\S)(?:#(?P<tag>[\w-]+)|@(?P<mention>[\w+-]+(?:\.[\w+-]+)*))',
+    re.UNICODE)
+
+HASHTAG_LINK = u'<a href="{url}" style="color: #7fadf8;">#{text}</a>'
+MENTION_LINK = u'<a href="{url}">@{text}</a>'
+
+
+def get_hashtags(text):
+    """
+    Returns the hashtags of ``text`` in order, without the '#'.
+    """
+    return [match.group('tag') for match in TOKEN_RE.finditer(text or u'')
+            if match.group('tag')]
+
+
+def _render_token(match):
+    tag = match.group('tag')
+    if tag:
+        tag = tag.lower()
+        url = reverse('hashtagged_item_list', kwargs={'tag': tag})
+        return HASHTAG_LINK.format(url=escape(url), text=escape(tag))
+
+    username = match.group('mention')
+    url = reverse('profile_view', kwargs={'username': username})
+    return MENTION_LINK.format(url=escape(url), text=escape(username))
+
+
+def render_links(text):
+    """
+    Returns ``text`` as HTML with its hashtags and mentions linked.
+    """
+    text = text or u''
+    html = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        html.append(escape(text[position:match.start()]))
+        html.append(_render_token(match))
+        position = match.end()
+    html.append(escape(text[position:]))
+    return mark_safe(u''.join(html))
@@ -1,7 +1,8 @@
 from django.db import models
 from django.test import TestCase
 
-from .models import HashtagMixin
+from .models import Hashtag, HashtagMixin
+from .rendering import render_links
 
 
 class TestModel(HashtagMixin):
@@ -27,3 +28,56 @@ class HashtagMixinUnitTest(TestCase):
                                      description='some #cool #text')
         self.assertIsNot(c.hashtags.all(), None, 'hashtags were not saved '
             'to the database.')
+
+    def test_only_changed_hashtags_updated(self):
+        c = TestModel.objects.create(title='foo',
+                                     description='some #cool #text')
+        cool = Hashtag.objects.get(tag='cool')
+
+        c.description = 'some #cool #new'
+        c.save()
+
+        self.assertEqual(sorted(c.hashtags.values_list('tag', flat=True)),
+            ['cool', 'new'], 'hashtags did not follow the edited text.')
+        self.assertEqual(Hashtag.objects.get(tag='cool').pk, cool.pk,
+            'unchanged hashtags should be kept, not recreated.')
+        self.assertEqual(Hashtag.objects.get(tag='cool').usage_count, 1)
+        self.assertEqual(Hashtag.objects.get(tag='text').usage_count, 0,
+            'a removed hashtag should have its usage_count decremented.')
+
+    def test_shared_hashtags_survive_delete(self):
+        first = TestModel.objects.create(title='foo', description='#cool')
+        TestModel.objects.create(title='bar', description='#cool')
+
+        first.delete()
+
+        self.assertEqual(Hashtag.objects.get(tag='cool').usage_count, 1,
+            'deleting one item should not drop a hashtag others still use.')
+
+    def test_queryset_delete_releases_hashtags(self):
+        TestModel.objects.create(title='foo', description='#cool')
+        TestModel.objects.create(title='bar', description='#cool')
+
+        TestModel.objects.all().delete()
+
+        self.assertEqual(Hashtag.objects.get(tag='cool').usage_count, 0,
+            'bulk deletes should decrement usage_count too.')
+
+
+class HashtagRenderingUnitTest(TestCase):
+
+    def test_links_rendered_and_text_escaped(self):
+        html = render_links(u'<b>hi</b> #Cool @someone\nbye #')
+        self.assertEqual(html, u'&lt;b&gt;hi&lt;/b&gt; '
+            u'<a href="/hashtag/cool/" style="color: #7fadf8;">#cool</a> '
+            u'<a href="/someone/">@someone</a>\nbye #')
+
+    def test_unchanged_source_not_reprocessed(self):
+        c = TestModel.objects.create(title='foo', description='#cool')
+        c.hashtags.clear()
+
+        c.title = 'bar'
+        c.save()
+
+        self.assertFalse(c.hashtags.exists(), 'saving an unchanged '
+            'description should not touch its hashtags.')
@@ -1,20 +1,35 @@
-from django.db.models import Q
 from django.shortcuts import render
-from django.views.decorators.cache import cache_page
 
+from core.cache import cache_page_depends, depends_on
 from photos.models import Photo
 
+from .models import Hashtag
+
 # Create your views here.
 
 
-@cache_page(60 * 3)
+@cache_page_depends(60 * 3)
 def hashtagged_item_list(request, tag):
-    photos = Photo.objects.filter(
-        Q(description__icontains=tag) |
-        Q(comment__hashtag_enabled_text__icontains=tag)
-    )[:200]
+    page_size = 200
+    try:
+        before = int(request.GET['before'])
+    except (KeyError, ValueError):
+        before = None
+
+    hashtag = Hashtag.objects.filter(tag=tag.lower()).first()
+    photos = []
+    if hashtag is not None:
+        photos = Photo.objects.tagged(hashtag, before=before,
+                                      limit=page_size + 1)
+    next_before = None
+    if len(photos) > page_size:
+        photos = photos[:page_size]
+        next_before = photos[-1].pk
+    depends_on(request, hashtag, *photos)
 
     context = {
+        'liked_photo_ids': Photo.objects.liked_ids(request.user, photos),
+        'next_before': next_before,
         'photos': photos,
         'tag': tag
     }
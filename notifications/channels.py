@@ -0,0 +1,114 @@
+"""
+Push channels telling connected clients that a user has new
+notifications.
+
+``RedisChannel`` works across processes through Redis pub/sub;
+``MemoryChannel`` keeps everything in process for tests and local
+development. The backend is set by ``NOTIFICATION_CHANNEL_BACKEND``.
+"""
+import json
+import logging
+import time
+
+from redis import RedisError
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.six.moves import queue
+
+from core.connections import get_redis_connection
+
+
+CHANNEL_NAME = 'notifications:{}'
+# seconds between reads of a Redis subscription while waiting
+POLL_INTERVAL = 0.25
+
+logger = logging.getLogger(__name__)
+
+_channels = {}
+
+
+def get_channel():
+    backend = settings.NOTIFICATION_CHANNEL_BACKEND
+    if backend not in _channels:
+        _channels[backend] = import_string(backend)()
+    return _channels[backend]
+
+
+class RedisChannel(object):
+
+    def publish(self, user_id, message):
+        # pushes are best effort, clients get the count when they reconnect
+        try:
+            get_redis_connection().publish(CHANNEL_NAME.format(user_id),
+                                           json.dumps(message))
+        except RedisError:
+            logger.warning('Could not publish to %s.', user_id, exc_info=True)
+
+    def subscribe(self, user_id):
+        return RedisSubscription(user_id)
+
+
+class RedisSubscription(object):
+
+    def __init__(self, user_id):
+        self.pubsub = get_redis_connection().pubsub(
+            ignore_subscribe_messages=True)
+        self.pubsub.subscribe(CHANNEL_NAME.format(user_id))
+
+    def get(self, timeout):
+        """
+        Returns the next message, or ``None`` if none was published within
+        ``timeout`` seconds. ``get_message`` of the pinned redis client
+        never blocks, so the subscription is polled until the deadline.
+        """
+        deadline = time.time() + timeout
+        while True:
+            message = self.pubsub.get_message()
+            if message is not None:
+                return json.loads(message['data'].decode('utf-8'))
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def close(self):
+        self.pubsub.close()
+
+
+class MemoryChannel(object):
+
+    def __init__(self):
+        self.subscriptions = {}
+
+    def publish(self, user_id, message):
+        for subscription in self.subscriptions.get(user_id, []):
+            subscription.messages.put(message)
+
+    def subscribe(self, user_id):
+        subscription = MemorySubscription(self, user_id)
+        self.subscriptions.setdefault(user_id, []).append(subscription)
+        return subscription
+
+
+class MemorySubscription(object):
+
+    def __init__(self, channel, user_id):
+        self.channel = channel
+        self.user_id = user_id
+        self.messages = queue.Queue()
+
+    def get(self, timeout):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.channel.subscriptions[self.user_id].remove(self)
+
+
+def publish_new_notifications(recipient_ids):
+    channel = get_channel()
+    for recipient_id in recipient_ids:
+        channel.publish(recipient_id, {'event': 'notification'})
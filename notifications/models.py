@@ -1,13 +1,38 @@
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models.query import prefetch_related_objects
 
 from core.models import TimeStampedModel
 
+from .channels import publish_new_notifications
+
 # Create your models here.
 
+RENDERED_KEY = 'notification-rendered:{}'
+UNREAD_COUNT_KEY = 'notification-unread:{}'
+GENERIC_OBJECTS = ('sender_object', 'action_object', 'target_object')
+
+
+def get_user_pk(user):
+    return getattr(user, 'pk', user)
+
+
+def reset_unread_count(recipient):
+    cache.delete(UNREAD_COUNT_KEY.format(get_user_pk(recipient)))
+
+
+def increment_unread_counts(recipients):
+    # users whose count isn't cached get it recounted on their next poll
+    for recipient in recipients:
+        try:
+            cache.incr(UNREAD_COUNT_KEY.format(get_user_pk(recipient)))
+        except ValueError:
+            pass
+
 
 class NotificationQuerySet(models.query.QuerySet):
     def get_user(self, recipient):
@@ -16,16 +41,28 @@ class NotificationQuerySet(models.query.QuerySet):
     def mark_all_read(self, recipient):
         qs = self.unread().get_user(recipient)
         qs.update(read=True)
+        reset_unread_count(recipient)
 
     def mark_all_unread(self, recipient):
         qs = self.read().get_user(recipient)
         qs.update(read=False)
+        reset_unread_count(recipient)
+
+    def mark_read(self, recipient, pks):
+        """
+        Marks the notifications ``pks`` of ``recipient`` as read with a
+        single update.
+        """
+        updated = self.unread().get_user(recipient).filter(
+            pk__in=pks).update(read=True)
+        if updated:
+            reset_unread_count(recipient)
+        return updated
 
     def mark_targetless(self, recipient):
         qs = self.unread().get_user(recipient)
-        qs_no_target = qs.filter(target_object_id=None)
-        if qs_no_target:
-            qs_no_target.update(read=True)
+        if qs.filter(target_object_id=None).update(read=True):
+            reset_unread_count(recipient)
 
     def read(self):
         return self.filter(read=True)
@@ -36,6 +73,13 @@ class NotificationQuerySet(models.query.QuerySet):
     def unread(self):
         return self.filter(read=False)
 
+    def with_objects(self):
+        """
+        Loads the sender, action and target of every notification with
+        one query per content type instead of three per notification.
+        """
+        return self.prefetch_related(*GENERIC_OBJECTS)
+
 
 class NotificationManager(models.Manager):
     def all_for_user(self, user):
@@ -54,6 +98,79 @@ class NotificationManager(models.Manager):
     def get_recent_for_user(self, user, num):
         return self.get_queryset().get_user(user)[:num]
 
+    def mark_read(self, user, pks):
+        return self.get_queryset().mark_read(user, pks)
+
+    def unread_count(self, user):
+        """
+        Number of unread notifications of ``user``, counted once and then
+        kept up to date in the cache as notifications are sent and read.
+        """
+        key = UNREAD_COUNT_KEY.format(user.pk)
+        count = cache.get(key)
+        if count is None:
+            count = self.all_unread(user).count()
+            cache.set(key, count, settings.NOTIFICATION_UNREAD_TIMEOUT)
+        return count
+
+    def render_all(self, notifications):
+        """
+        Sets ``rendered`` (the text and thumbnail of the notification) on
+        each of ``notifications`` from the cache, loading the generic
+        objects only for the ones that were not rendered before.
+        """
+        notifications = list(notifications)
+        keys = dict((RENDERED_KEY.format(notification.pk), notification)
+                    for notification in notifications)
+        cached = cache.get_many(keys.keys())
+
+        missing = [notification for key, notification in keys.items()
+                   if key not in cached]
+        if missing:
+            prefetch_related_objects(missing, GENERIC_OBJECTS)
+            rendered = {}
+            for notification in missing:
+                rendered[RENDERED_KEY.format(notification.pk)] = {
+                    'text': notification.get_text(),
+                    'thumbnail_url': notification.get_thumbnail_url(),
+                }
+            cache.set_many(rendered, settings.NOTIFICATION_RENDERED_TIMEOUT)
+            cached.update(rendered)
+
+        for key, notification in keys.items():
+            notification.rendered = cached[key]
+        return notifications
+
+    def bulk_notify(self, sender, recipients, verb, action=None, target=None):
+        """
+        Creates one notification per recipient with a single insert.
+        ``recipients`` may be users or user ids; the sender is never
+        notified of their own action.
+        """
+        recipient_ids = set(getattr(recipient, 'pk', recipient)
+                            for recipient in recipients)
+        recipient_ids.discard(sender.pk)
+        if not recipient_ids:
+            return []
+
+        fields = {
+            'verb': verb,
+            'sender_content_type': ContentType.objects.get_for_model(sender),
+            'sender_object_id': sender.pk,
+        }
+        for option, obj in (('action', action), ('target', target)):
+            if obj is not None:
+                fields['{}_content_type'.format(option)] = (
+                    ContentType.objects.get_for_model(obj))
+                fields['{}_object_id'.format(option)] = obj.pk
+
+        notifications = [self.model(recipient_id=recipient_id, **fields)
+                         for recipient_id in sorted(recipient_ids)]
+        self.bulk_create(notifications, batch_size=500)
+        increment_unread_counts(recipient_ids)
+        publish_new_notifications(recipient_ids)
+        return notifications
+
 
 class Notification(TimeStampedModel):
     # JP
@@ -90,10 +207,14 @@ class Notification(TimeStampedModel):
     objects = NotificationManager()
 
     class Meta:
+        index_together = [['recipient', 'created', 'id']]
         ordering = ['-created']
         app_label = 'notifications'
 
     def __unicode__(self):
+        return self.get_text()
+
+    def get_text(self):
         try:
             target_url = self.target_object.get_absolute_url()
         except:
@@ -139,3 +260,9 @@ class Notification(TimeStampedModel):
             return "%(target_url)s" % context
         else:
             pass
+
+    def get_thumbnail_url(self):
+        get_thumbnail_url = getattr(self.target_object, 'get_thumbnail_url',
+                                    None)
+        if get_thumbnail_url is not None:
+            return get_thumbnail_url()
@@ -1,8 +1,14 @@
+import logging
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.dispatch import Signal
 
 from .models import Notification
+from .tasks import send_notifications
+
 
+logger = logging.getLogger(__name__)
 
 notify = Signal(providing_args=[
                 'recipient',
@@ -12,47 +18,39 @@ notify = Signal(providing_args=[
                 'affected_users'])
 
 
+def get_reference(obj):
+    if obj is None:
+        return None
+    return ContentType.objects.get_for_model(obj).pk, obj.pk
+
+
 def new_notification(sender, **kwargs):
-    kwargs.pop('signal', None)
-    affected_users = kwargs.pop('affected_users', None)
-    recipient = kwargs.pop("recipient")
-    verb = kwargs.pop("verb")
+    affected_users = kwargs.get('affected_users')
+    recipient = kwargs['recipient']
+    verb = kwargs['verb']
+    action = kwargs.get('action')
+    target = kwargs.get('target')
 
     if recipient == sender:
-        pass
-    else:
-        if affected_users is not None:
-            for u in affected_users:
-                new_note = Notification(
-                    recipient=u,
-                    verb=verb,
-                    sender_content_type=ContentType.objects.get_for_model(sender),
-                    sender_object_id=sender.id,
-                )
-                for option in ("target", "action"):
-                    try:
-                        obj = kwargs[option]
-                        if obj is not None:
-                            setattr(new_note, "{}_content_type".format(option),
-                                    ContentType.objects.get_for_model(obj))
-                            setattr(new_note, "{}_object_id".format(option),
-                                    obj.id)
-                    except:
-                        pass
-                new_note.save()
-        else:
-            new_note = Notification(
-                recipient=recipient,
-                verb=verb,
-                sender_content_type=ContentType.objects.get_for_model(sender),
-                sender_object_id=sender.id,
-            )
-            for option in ("target", "action"):
-                obj = kwargs.pop(option, None)
-                if obj is not None:
-                    setattr(new_note, "{}_content_type".format(option),
-                            ContentType.objects.get_for_model(obj))
-                    setattr(new_note, "{}_object_id".format(option), obj.id)
-            new_note.save()
+        return
+
+    recipients = [recipient] if affected_users is None else affected_users
+    if len(recipients) > settings.NOTIFICATION_ASYNC_THRESHOLD:
+        # large threads are fanned out by a worker instead of the request
+        try:
+            send_notifications.delay(
+                get_reference(sender),
+                [getattr(user, 'pk', user) for user in recipients],
+                verb,
+                action=get_reference(action),
+                target=get_reference(target))
+            return
+        except Exception:
+            # nothing would send them later, so they are sent right away
+            logger.exception('Could not queue the %s notifications of %s.',
+                             verb, get_reference(sender))
+
+    Notification.objects.bulk_notify(sender, recipients, verb,
+                                     action=action, target=target)
 
 notify.connect(new_notification)
@@ -0,0 +1,26 @@
+from __future__ import absolute_import
+
+from celery import shared_task
+
+from django.contrib.contenttypes.models import ContentType
+
+from .models import Notification
+
+
+def get_object(reference):
+    if reference is None:
+        return None
+    content_type_id, object_id = reference
+    return ContentType.objects.get_for_id(
+        content_type_id).get_object_for_this_type(pk=object_id)
+
+
+@shared_task
+def send_notifications(sender, recipient_ids, verb, action=None, target=None):
+    """
+    Deferred ``Notification.objects.bulk_notify``; objects are passed as
+    ``(content_type_id, object_id)`` pairs.
+    """
+    Notification.objects.bulk_notify(get_object(sender), recipient_ids, verb,
+                                     action=get_object(action),
+                                     target=get_object(target))
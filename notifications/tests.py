@@ -1,3 +1,235 @@
-from django.test import TestCase
+from mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import MyUser
+from .channels import RedisChannel
+from .models import Notification
+from .signals import notify
+from .tasks import send_notifications
+
+
+def make_user(username='testuser', email='test@user.com', password='testuser'):
+    return MyUser.objects.create_user(username=username, email=email,
+        password=password)
+
+
+class BulkNotifyUnitTest(TestCase):
+
+    def setUp(self):
+        self.sender = make_user()
+        self.recipients = [
+            make_user(username='user{}'.format(i),
+                      email='user{}@user.com'.format(i))
+            for i in range(5)]
+
+    def test_one_notification_per_recipient(self):
+        Notification.objects.bulk_notify(
+            self.sender, self.recipients + [self.sender, self.recipients[0]],
+            'replied to')
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient', flat=True)),
+            sorted(user.pk for user in self.recipients),
+            'every recipient should get exactly one notification and the '
+            'sender none.')
+
+    def test_constant_number_of_queries(self):
+        # warm the content type cache
+        Notification.objects.bulk_notify(self.sender, self.recipients[:1],
+                                         'liked')
+        with CaptureQueriesContext(connection) as context:
+            Notification.objects.bulk_notify(self.sender, self.recipients,
+                                             'liked', target=self.sender)
+        self.assertEqual(len(context.captured_queries), 1,
+            'bulk_notify should insert all notifications at once.')
+
+
+@override_settings(NOTIFICATION_ASYNC_THRESHOLD=2)
+class NotifySignalUnitTest(TestCase):
+
+    def setUp(self):
+        self.sender = make_user()
+        self.recipients = [
+            make_user(username='user{}'.format(i),
+                      email='user{}@user.com'.format(i))
+            for i in range(5)]
+
+    def notify(self):
+        notify.send(self.sender, recipient=self.recipients[0],
+                    verb='commented on', target=self.sender,
+                    affected_users=self.recipients)
+        return Notification.objects.filter(verb='commented on').count()
+
+    def test_large_fan_out_sent_by_task(self):
+        # tasks run in process while testing
+        with patch.object(send_notifications, 'delay',
+                          wraps=send_notifications.delay) as delay:
+            self.assertEqual(self.notify(), 5)
+        self.assertTrue(delay.called)
+
+    def test_large_fan_out_sent_when_broker_unreachable(self):
+        with patch.object(send_notifications, 'delay',
+                          side_effect=IOError('connection refused')):
+            self.assertEqual(self.notify(), 5, 'notifications should be '
+                'sent from the request when they cannot be queued.')
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RenderNotificationsUnitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.recipient = make_user()
+        for i in range(5):
+            sender = make_user(username='user{}'.format(i),
+                               email='user{}@user.com'.format(i))
+            Notification.objects.bulk_notify(sender, [self.recipient],
+                                             'is now supporting you',
+                                             target=self.recipient)
+
+    def render(self):
+        notifications = Notification.objects.filter(recipient=self.recipient)
+        with CaptureQueriesContext(connection) as context:
+            rendered = Notification.objects.render_all(notifications)
+        return rendered, len(context.captured_queries)
+
+    def test_generic_objects_loaded_per_content_type(self):
+        rendered, queries = self.render()
+        self.assertEqual(len(rendered), 5)
+        # the notifications, then the senders and the targets (both users)
+        self.assertLessEqual(queries, 3, 'rendering ran {} queries; the '
+            'generic objects should be loaded per content type.'.format(
+                queries))
+
+    def test_rendered_text_cached(self):
+        first, queries = self.render()
+        second, queries = self.render()
+        self.assertEqual([n.rendered for n in first],
+                         [n.rendered for n in second])
+        self.assertEqual(queries, 1, 'rendering a second time should only '
+            'load the notifications.')
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UnreadCountUnitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.sender = make_user()
+        self.recipient = make_user(username='recipient', email='r@user.com')
+
+    def notify(self):
+        return Notification.objects.bulk_notify(self.sender, [self.recipient],
+                                                'liked', target=self.sender)
+
+    def test_count_kept_up_to_date_without_queries(self):
+        self.notify()
+        self.assertEqual(Notification.objects.unread_count(self.recipient), 1)
+
+        self.notify()
+        with CaptureQueriesContext(connection) as context:
+            count = Notification.objects.unread_count(self.recipient)
+        self.assertEqual(count, 2)
+        self.assertEqual(len(context.captured_queries), 0, 'the unread '
+            'count should be served from the cache.')
+
+    def test_mark_read_single_update(self):
+        self.notify()
+        self.notify()
+        pks = list(Notification.objects.filter(
+            recipient=self.recipient).values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connection) as context:
+            Notification.objects.mark_read(self.recipient, pks)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(Notification.objects.unread_count(self.recipient), 0)
+
+
+@override_settings(
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    NOTIFICATION_CHANNEL_BACKEND='notifications.channels.MemoryChannel',
+    NOTIFICATION_STREAM_HEARTBEAT=0.01)
+class NotificationStreamFunctionalTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.sender = make_user()
+        self.recipient = make_user(username='recipient', email='r@user.com')
+        self.client = Client()
+        self.client.login(username='recipient', password='testuser')
+
+    def test_new_notification_pushed(self):
+        response = self.client.get(reverse('notifications_stream'))
+        events = iter(response.streaming_content)
+
+        self.assertEqual(next(events), b'retry: 3000\n')
+        self.assertIn(b'"count": 0', next(events))
+
+        Notification.objects.bulk_notify(self.sender, [self.recipient],
+                                         'liked', target=self.sender)
+        self.assertIn(b'"count": 1', next(events), 'the stream should push '
+            'the new unread count.')
+
+
+class FakeRedis(object):
+    """
+    Redis pub/sub as the pinned redis client exposes it: ``get_message``
+    returns at once, with ``None`` when nothing is waiting.
+    """
+    def __init__(self):
+        self.subscriptions = {}
+
+    def publish(self, channel, message):
+        for pubsub in self.subscriptions.get(channel, []):
+            pubsub.messages.append({'type': 'message', 'channel': channel,
+                                    'data': message.encode('utf-8')})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakePubSub(object):
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = []
+
+    def subscribe(self, channel):
+        self.redis.subscriptions.setdefault(channel, []).append(self)
+
+    def get_message(self, ignore_subscribe_messages=False):
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        pass
+
+
+class RedisChannelUnitTest(TestCase):
+
+    def setUp(self):
+        patcher = patch('notifications.channels.get_redis_connection',
+                        return_value=FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.channel = RedisChannel()
+
+    def test_published_message_received(self):
+        subscription = self.channel.subscribe(1)
+        self.channel.publish(1, {'event': 'notification'})
+
+        self.assertEqual(subscription.get(timeout=1),
+                         {'event': 'notification'})
+
+    def test_get_waits_until_timeout(self):
+        subscription = self.channel.subscribe(1)
+        self.channel.publish(2, {'event': 'notification'})
+
+        self.assertIsNone(subscription.get(timeout=0.01))
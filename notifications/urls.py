@@ -4,4 +4,6 @@ from django.conf.urls import patterns, url
 urlpatterns = patterns('notifications.views',
     url(r'^$', 'all', name='notifications_all'),
     url(r'^ajax/$', 'get_notifications_ajax', name='get_notifications_ajax'),
+    url(r'^ajax/read/$', 'mark_all_read_ajax', name='mark_all_read_ajax'),
+    url(r'^stream/$', 'stream', name='notifications_stream'),
 )
@@ -1,8 +1,14 @@
+import json
+import time
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.shortcuts import Http404, render
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
+from .channels import get_channel
 from .models import Notification
 
 # Create your views here.
@@ -10,16 +16,14 @@ from .models import Notification
 
 @login_required
 def all(request):
-    notifications = Notification.objects.all_for_user(request.user)[:50]
-    for notification in notifications:
-        if notification.recipient == request.user:
-            notification.read = True
-            notification.save()
-        else:
-            raise Http404
+    notifications = list(
+        Notification.objects.all_for_user(request.user)[:50])
+    Notification.objects.mark_read(request.user, [
+        notification.pk for notification in notifications
+        if not notification.read])
 
     context = {
-        "notifications": notifications
+        "notifications": Notification.objects.render_all(notifications)
     }
     return render(request, "notifications/notifications_all.html", context)
 
@@ -27,9 +31,59 @@ def all(request):
 @login_required
 @require_http_methods(['POST'])
 def get_notifications_ajax(request):
-    notifications = Notification.objects.all_unread(request.user)
-    count = notifications.count()
     data = {
-        "count": count
+        "count": Notification.objects.unread_count(request.user)
+    }
+    return JsonResponse(data)
+
+
+@login_required
+@require_http_methods(['POST'])
+def mark_all_read_ajax(request):
+    Notification.objects.get_queryset().mark_all_read(request.user)
+    data = {
+        "count": 0
     }
     return JsonResponse(data)
+
+
+def format_event(event, data):
+    return 'event: {}\ndata: {}\n\n'.format(event, json.dumps(data))
+
+
+def unread_events(user):
+    # subscribe first so nothing sent while counting is missed
+    subscription = get_channel().subscribe(user.pk)
+    try:
+        yield 'retry: 3000\n'
+        yield format_event('unread', {
+            'count': Notification.objects.unread_count(user)})
+
+        deadline = time.time() + settings.NOTIFICATION_STREAM_TIMEOUT
+        while time.time() < deadline:
+            # don't hold a database connection while waiting; Django only
+            # closes it once the whole stream is finished
+            connection.close()
+            message = subscription.get(settings.NOTIFICATION_STREAM_HEARTBEAT)
+            if message is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield format_event('unread', {
+                    'count': Notification.objects.unread_count(user)})
+    finally:
+        subscription.close()
+
+
+@login_required
+@require_http_methods(['GET'])
+def stream(request):
+    """
+    Server-sent events with the unread count of the user, pushed when
+    they get a notification. Needs an async worker (see gunicorn.conf.py)
+    since each client holds its connection open.
+    """
+    response = StreamingHttpResponse(unread_events(request.user),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
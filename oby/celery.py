@@ -1,7 +1,6 @@
 from __future__ import absolute_import
 
 import os
-import django
 
 from django.conf import settings
 
@@ -13,8 +12,8 @@ from celery.utils.log import get_task_logger
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'oby.settings')
 
-django.setup()
-
+# imported by oby/__init__.py, so Django is set up by whatever imports
+# oby: manage.py, the WSGI handler or the worker's Django fixup
 app = Celery('oby')
 app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
@@ -1,33 +1,163 @@
 import re
+import threading
+import time
 
 from django.conf import settings
-from django.middleware.cache import *
+from django.core.cache import caches
+from django.middleware.cache import (FetchFromCacheMiddleware,
+                                     UpdateCacheMiddleware)
+from django.utils.cache import (get_cache_key, get_max_age, has_vary_header,
+                                learn_cache_key, patch_response_headers)
+
+from core.cache import register
+
+
+STATS_KEY = 'cache-stats:{}'
+STATS_EVENTS = ('hit', 'stale', 'miss', 'bypass')
+
+_bypass_regex = None
+
+
+def get_bypass_regex():
+    """
+    All ``CACHE_BYPASS_URLS`` compiled into a single alternation, so a
+    request is checked with one match instead of one per pattern.
+    """
+    global _bypass_regex
+    if _bypass_regex is None:
+        _bypass_regex = re.compile('|'.join(
+            '(?:{})'.format(regex) for regex in settings.CACHE_BYPASS_URLS))
+    return _bypass_regex
+
+
+class CacheStats(object):
+    """
+    Counts cache hits, stale hits, misses and bypasses. Counts are kept
+    in process, behind a lock for threaded workers, and added to the
+    shared cache every ``CACHE_STATS_FLUSH_EVERY`` events to keep
+    requests cheap.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(STATS_EVENTS, 0)
+        self.pending = 0
+
+    def _take_counts(self):
+        counts, self.counts = self.counts, dict.fromkeys(STATS_EVENTS, 0)
+        self.pending = 0
+        return counts
+
+    def record(self, cache, event):
+        with self.lock:
+            self.counts[event] += 1
+            self.pending += 1
+            if self.pending < settings.CACHE_STATS_FLUSH_EVERY:
+                return
+            counts = self._take_counts()
+        self._add_counts(cache, counts)
+
+    def flush(self, cache):
+        with self.lock:
+            counts = self._take_counts()
+        self._add_counts(cache, counts)
+
+    def _add_counts(self, cache, counts):
+        for event, count in counts.items():
+            if not count:
+                continue
+            key = STATS_KEY.format(event)
+            if not cache.add(key, count, None):
+                try:
+                    cache.incr(key, count)
+                except ValueError:
+                    cache.set(key, count, None)
+
+    def get_totals(self, cache):
+        totals = cache.get_many([STATS_KEY.format(event)
+                                 for event in STATS_EVENTS])
+        return dict((event, totals.get(STATS_KEY.format(event), 0))
+                    for event in STATS_EVENTS)
+
+
+stats = CacheStats()
+
+
+def get_stats():
+    return stats.get_totals(caches[settings.CACHE_MIDDLEWARE_ALIAS])
+
+
+def get_lock_key(cache_key):
+    return '{}:lock'.format(cache_key)
+
+
+class CustomUpdateCacheMiddleware(UpdateCacheMiddleware):
+    """
+    Stores responses for ``CACHE_STALE_SECONDS`` past their expiry and
+    marks them with the time they go stale, so that
+    ``CustomFetchFromCacheMiddleware`` can keep serving them while one
+    request regenerates the page.
+    """
+    def process_response(self, request, response):
+        lock_key = getattr(request, '_cache_lock_key', None)
+        try:
+            return self.update_cache(request, response)
+        finally:
+            if lock_key is not None:
+                self.cache.delete(lock_key)
+
+    def update_cache(self, request, response):
+        if not self._should_update_cache(request, response):
+            return response
+        if response.streaming or response.status_code != 200:
+            return response
+        # don't cache responses setting cookies for cookieless visitors
+        if (not request.COOKIES and response.cookies and
+                has_vary_header(response, 'Cookie')):
+            return response
+
+        timeout = get_max_age(response)
+        if timeout is None:
+            timeout = self.cache_timeout
+        elif timeout == 0:
+            return response
+        patch_response_headers(response, timeout)
+        if not timeout:
+            return response
+
+        stored_timeout = timeout + settings.CACHE_STALE_SECONDS
+        cache_key = learn_cache_key(request, response, stored_timeout,
+                                    self.key_prefix, cache=self.cache)
+        response._cache_fresh_until = time.time() + timeout
+        # set by ``cache_page_depends``, so saves evict this copy as well
+        register(cache_key, *getattr(response, '_cache_tags', ()))
+        if hasattr(response, 'render') and callable(response.render):
+            response.add_post_render_callback(
+                lambda r: self.cache.set(cache_key, r, stored_timeout))
+        else:
+            self.cache.set(cache_key, response, stored_timeout)
+        return response
 
 
 class CustomFetchFromCacheMiddleware(FetchFromCacheMiddleware):
     """
     Implements a custom version of the process_request
-    function of django's FetchFromCacheMiddleware
+    function of django's FetchFromCacheMiddleware: urls matching
+    ``CACHE_BYPASS_URLS`` skip the cache, and a stale page is served to
+    everyone but the single request that takes the lock to rebuild it.
     """
     def process_request(self, request):
         """
         Checks whether the page is already cached and returns the cached
         version if available.
         """
-        if not request.method in ('GET', 'HEAD'):
+        if request.method not in ('GET', 'HEAD'):
             request._cache_update_cache = False
             return None  # Don't bother checking the cache.
 
-        """
-        see if current request url is
-        in the list of urls to bypass in the cache
-        if so, don't check the cache
-        """
-        for regex in settings.CACHE_BYPASS_URLS:
-            request_url = request.get_full_path()
-            if re.match(regex, request_url):
-                request._cache_update_cache = False
-                return None
+        if get_bypass_regex().match(request.path):
+            request._cache_update_cache = False
+            stats.record(self.cache, 'bypass')
+            return None
 
         # try and get the cached GET response
         cache_key = get_cache_key(request, self.key_prefix, 'GET',
@@ -35,6 +165,7 @@ class CustomFetchFromCacheMiddleware(FetchFromCacheMiddleware):
 
         if cache_key is None:
             request._cache_update_cache = True
+            stats.record(self.cache, 'miss')
             return None  # No cache information available, need to rebuild.
         response = self.cache.get(cache_key, None)
         # if it wasn't found and we are looking for a HEAD, try looking just for that
@@ -45,8 +176,23 @@ class CustomFetchFromCacheMiddleware(FetchFromCacheMiddleware):
 
         if response is None:
             request._cache_update_cache = True
+            stats.record(self.cache, 'miss')
             return None  # No cache information available, need to rebuild.
 
+        fresh_until = getattr(response, '_cache_fresh_until', None)
+        if fresh_until is not None and fresh_until < time.time():
+            lock_key = get_lock_key(cache_key)
+            if self.cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+                # this request rebuilds the page, the others get it stale
+                request._cache_update_cache = True
+                request._cache_lock_key = lock_key
+                stats.record(self.cache, 'miss')
+                return None
+            request._cache_update_cache = False
+            stats.record(self.cache, 'stale')
+            return response
+
         # hit, return cached response
         request._cache_update_cache = False
+        stats.record(self.cache, 'hit')
         return response
@@ -1,3 +1,5 @@
+import sys
+
 from .common import *
 from .prod import *
 
@@ -7,3 +9,10 @@ try:
     from .dev import *
 except ImportError:
     pass
+
+
+# the test runner needs neither a broker nor S3: tasks run in process and
+# files are kept on disk
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    CELERY_ALWAYS_EAGER = True
+    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
@@ -147,7 +147,7 @@ INSTALLED_APPS = (
 # MIDDLEWARE #
 ##############
 MIDDLEWARE_CLASSES = (
-    'django.middleware.cache.UpdateCacheMiddleware',  # This must be first on the list
+    'oby.middleware.CustomUpdateCacheMiddleware',  # This must be first on the list
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -157,9 +157,30 @@ MIDDLEWARE_CLASSES = (
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',  # This must be last on the list
+    'oby.middleware.CustomFetchFromCacheMiddleware',  # This must be last on the list
 )
 
+# paths never served from or stored in the page cache
+CACHE_BYPASS_URLS = (
+    r'^/hide/oby/',  # admin, API and staff pages
+    r'^/grappelli/',
+    r'^/__debug__/',
+    r'^/ajaxsearch/',
+    r'^/donations/',
+    r'^/notifications/',
+    r'^/p/upload/',
+    r'^/register/',
+    r'^/settings/',
+    r'^/signin/',
+)
+# stale pages are served for this long while one request rebuilds them
+CACHE_STALE_SECONDS = 60
+CACHE_LOCK_TIMEOUT = 30
+CACHE_STATS_FLUSH_EVERY = 100
+# per-view caches are kept apart from the page cache middleware's entries,
+# which it serves stale while rebuilding them
+CACHE_VIEW_KEY_PREFIX = 'view'
+
 
 ROOT_URLCONF = 'oby.urls'
 WSGI_APPLICATION = 'oby.wsgi.application'
@@ -197,6 +218,105 @@ FILE_UPLOAD_HANDLERS = (
     "django.core.files.uploadhandler.TemporaryFileUploadHandler",
 )
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5 MB
+# (width, height) bounds of the copies made of every uploaded photo;
+# the thumbnail is cropped to fill, the others keep their proportions
+PHOTO_RENDITIONS = {
+    'thumbnail': (300, 300),
+    'feed': (640, 1280),
+    'retina': (1280, 2560),
+}
+PHOTO_RENDITION_QUALITY = 85
+PHOTO_MIN_WIDTH = 80
+PHOTO_MIN_HEIGHT = 80
+PHOTO_MAX_HEIGHT = 1500
+# direct uploads: lifetime of an upload URL and the largest accepted file
+PHOTO_UPLOAD_EXPIRY = 60 * 15
+PHOTO_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+
+############
+# TIMELINE #
+############
+# entries kept per timeline; trim_timelines deletes older ones hourly
+TIMELINE_SIZE = 250
+# creators with more followers than this are merged in on read
+# instead of being fanned out to every follower on write
+TIMELINE_FANOUT_LIMIT = 5000
+
+
+################
+# FOLLOW GRAPH #
+################
+FOLLOW_GRAPH_TIMEOUT = 60 * 15
+FOLLOW_SUGGESTIONS_LIMIT = 50
+
+
+###########
+# RANKING #
+###########
+RANKING_SIZE = 600
+RANKING_WINDOW_DAYS = 30
+RANKING_GRAVITY = 1.5
+
+
+#################
+# NOTIFICATIONS #
+#################
+# notifications for more recipients than this are created by a worker
+NOTIFICATION_ASYNC_THRESHOLD = 50
+NOTIFICATION_RENDERED_TIMEOUT = 60 * 60 * 24
+NOTIFICATION_UNREAD_TIMEOUT = 60 * 60
+NOTIFICATION_CHANNEL_BACKEND = 'notifications.channels.RedisChannel'
+# clients reconnect after this many seconds; comments are sent every
+# heartbeat so proxies keep idle streams open
+NOTIFICATION_STREAM_TIMEOUT = 60 * 5
+NOTIFICATION_STREAM_HEARTBEAT = 20
+
+
+##########
+# SEARCH #
+##########
+SEARCH_RESULTS_LIMIT = 10
+SEARCH_PAGE_LIMIT = 50
+SEARCH_CACHE_TIMEOUT = 60
+# processes further behind than this many changes rebuild their index
+SEARCH_MAX_PENDING_CHANGES = 500
+SEARCH_CHANGE_TIMEOUT = 60 * 60 * 24
+
+
+#############
+# ANALYTICS #
+#############
+ANALYTICS_FLUSH_BATCH_SIZE = 1000
+
+
+#########
+# REDIS #
+#########
+REDIS_URL = 'redis://localhost:6379/0'
+
+
+##########
+# CELERY #
+##########
+CELERYBEAT_SCHEDULE = {
+    'refresh-photo-rankings': {
+        'task': 'photos.tasks.refresh_photo_rankings',
+        'schedule': datetime.timedelta(minutes=10),
+    },
+    'flush-page-views': {
+        'task': 'analytics.tasks.flush_page_views',
+        'schedule': datetime.timedelta(minutes=1),
+    },
+    'refresh-follow-suggestions': {
+        'task': 'accounts.tasks.refresh_follow_suggestions',
+        'schedule': datetime.timedelta(hours=24),
+    },
+    'trim-timelines': {
+        'task': 'photos.tasks.trim_timelines',
+        'schedule': datetime.timedelta(hours=1),
+    },
+}
 
 
 #######
@@ -213,6 +333,11 @@ REST_FRAMEWORK = {
     ),
     'PAGINATE_BY': 300
 }
+# photos listed per category by the category list API
+CATEGORY_LIST_PHOTOS = 30
+# thumbnails embedded in each user of the profile list API
+USER_SUMMARY_THUMBNAILS = 3
+
 JWT_AUTH = {
     'JWT_RESPONSE_PAYLOAD_HANDLER':
         'oby.utils.jwt_response_payload_handler',
@@ -0,0 +1,74 @@
+import time
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils.cache import get_cache_key
+
+from .middleware import (CustomFetchFromCacheMiddleware,
+                         CustomUpdateCacheMiddleware, get_lock_key)
+
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CACHE_MIDDLEWARE_ALIAS='default',
+                   CACHE_MIDDLEWARE_KEY_PREFIX='', CACHE_MIDDLEWARE_SECONDS=8)
+class PageCacheMiddlewareUnitTest(TestCase):
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.factory = RequestFactory()
+        self.fetch = CustomFetchFromCacheMiddleware()
+        self.update = CustomUpdateCacheMiddleware()
+
+    def request(self, path='/about/'):
+        request = self.factory.get(path)
+        return request, self.fetch.process_request(request)
+
+    def store(self, content='page'):
+        request, cached = self.request()
+        self.assertIsNone(cached)
+        self.update.process_response(request, HttpResponse(content))
+
+    def make_stale(self):
+        request = self.factory.get('/about/')
+        key = get_cache_key(request, '', 'GET', cache=self.cache)
+        response = self.cache.get(key)
+        response._cache_fresh_until = time.time() - 1
+        self.cache.set(key, response)
+        return key
+
+    def test_bypassed_urls_are_never_cached(self):
+        request, cached = self.request('/settings/')
+        self.assertIsNone(cached)
+        self.assertFalse(request._cache_update_cache)
+
+    def test_fresh_page_served_from_cache(self):
+        self.store()
+        request, cached = self.request()
+        self.assertEqual(cached.content, b'page')
+
+    def test_stale_page_rebuilt_by_one_request(self):
+        self.store()
+        key = self.make_stale()
+
+        # the first request takes the lock and rebuilds the page
+        rebuilding, cached = self.request()
+        self.assertIsNone(cached)
+        self.assertTrue(self.cache.get(get_lock_key(key)))
+
+        # everyone else gets the stale copy meanwhile
+        request, cached = self.request()
+        self.assertEqual(cached.content, b'page')
+
+        self.update.process_response(rebuilding, HttpResponse('new'))
+        self.assertIsNone(self.cache.get(get_lock_key(key)),
+            'the lock should be released once the page is stored.')
+        request, cached = self.request()
+        self.assertEqual(cached.content, b'new')
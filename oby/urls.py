@@ -24,6 +24,8 @@ urlpatterns = patterns('',
     # ADMIN
     url(r'^grappelli/', include('grappelli.urls')),
     url(r'^hide/oby/admin/', include(admin.site.urls)),
+    url(r'^hide/oby/cache-stats/$', 'oby.views.cache_stats',
+        name='cache_stats'),
 
     # GENERAL
     url(r'^about/$', 'oby.views.about', name='about'),
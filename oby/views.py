@@ -1,23 +1,32 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.views.decorators.cache import cache_page
 
 from itertools import chain
 
-from accounts.models import Follower
-from photos.models import Category, Photo
+from accounts import graph
+from accounts.models import Follower, FollowSuggestion, MyUser
+from core.cache import cache_page_depends, depends_on, make_tag
+from photos.models import Category, Photo, TimelineEntry
+
+from .middleware import get_stats
 
 # Create views here.
 
 
-@cache_page(60 * 2)
+@cache_page_depends(60 * 2)
 def home(request):
     if request.user.is_authenticated():
-        categories = Category.objects.most_posts()
-        photos = Photo.objects.most_liked_offset()[:30]
+        categories = list(Category.objects.most_posts())
+        photos = list(Photo.objects.most_liked_offset()[:30])
+        depends_on(request, *(categories + photos))
 
         context = {
             'categories': categories,
+            'liked_photo_ids': Photo.objects.liked_ids(request.user, photos),
             'photos': photos
         }
         return render(request, 'accounts/home_logged_in.html', context)
@@ -25,49 +34,59 @@ def home(request):
 
 
 @login_required
-@cache_page(60 * 2)
+@cache_page_depends(60 * 2)
 def timeline(request):
     user = request.user
+    depends_on(request, user)
 
     try:
         follow = Follower.objects.get(user=user)
     except Follower.DoesNotExist:
         follow = None
 
-    photos_self = Photo.objects.own(user)
-
     if follow:
-        photos_following = Photo.objects.following(user)
-        photos = (photos_following | photos_self).distinct()[:250]
+        photos = TimelineEntry.objects.photos_for(user)
+        # new photos by followed users invalidate their creator's tag
+        depends_on(request, *[make_tag(MyUser, pk) for pk in
+                              graph.following_ids(user)])
+        depends_on(request, *photos)
     else:
-        # Add suggested users
-        photos_suggested = Photo.objects.all() \
-            .select_related("creator", "category") \
-            .exclude(creator=user)[:50]
-        photos = chain(photos_self, photos_suggested)
+        # photos of the users suggested to new users, refreshed offline
+        # by accounts.tasks.refresh_follow_suggestions
+        suggested = FollowSuggestion.objects.suggested_ids(user)
+        photos_self = Photo.objects.own(user)
+        photos_suggested = Photo.objects.filter(creator__in=suggested) \
+            .select_related("creator", "category")[:50]
+        photos = list(chain(photos_self, photos_suggested))
 
     context = {
         'follow': follow,
+        'liked_photo_ids': Photo.objects.liked_ids(user, photos),
         'photos': photos
     }
     return render(request, 'accounts/timeline.html', context)
 
 
-@cache_page(60 * 10)
+@cache_page(60 * 10, key_prefix=settings.CACHE_VIEW_KEY_PREFIX)
 def about(request):
     return render(request, 'company/about.html', {})
 
 
-@cache_page(60 * 10)
+@cache_page(60 * 10, key_prefix=settings.CACHE_VIEW_KEY_PREFIX)
 def privacy_policy(request):
     return render(request, 'company/privacy_policy.html', {})
 
 
-@cache_page(60 * 10)
+@cache_page(60 * 10, key_prefix=settings.CACHE_VIEW_KEY_PREFIX)
 def terms_of_use(request):
     return render(request, 'company/terms_of_use.html', {})
 
 
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse(get_stats())
+
+
 # @login_required(login_url='/staff/login/')
 # def staff_home(request):
 #     context = {}
@@ -14,7 +14,7 @@ class PhotoAdmin(admin.ModelAdmin):
     search_fields = ['creator__username']
     fields = ['creator', 'photo', 'category', 'slug',
               'description', 'is_active', 'featured']
-    ordering = ['-likers']
+    ordering = ['-likes_count']
 
     class Meta:
         model = Photo
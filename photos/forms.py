@@ -37,9 +37,9 @@ class PhotoUploadForm(forms.ModelForm):
             w, h = get_image_dimensions(photo)
 
             # validate dimensions
-            min_width = 80
-            min_height = 80
-            max_height = 1500
+            min_width = settings.PHOTO_MIN_WIDTH
+            min_height = settings.PHOTO_MIN_HEIGHT
+            max_height = settings.PHOTO_MAX_HEIGHT
             if min_width > w or min_height > h:
                 raise forms.ValidationError(
                     u'That image is too small. '
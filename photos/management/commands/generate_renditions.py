@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from photos.models import Photo
+from photos.tasks import generate_photo_renditions
+
+
+class Command(BaseCommand):
+    help = ('Queues the generation of renditions for every photo that does '
+            'not have them yet.')
+
+    def handle(self, *args, **options):
+        pks = Photo.objects.filter(thumbnail='').values_list('pk', flat=True)
+        for pk in pks:
+            generate_photo_renditions.delay(pk)
+        self.stdout.write('Queued {} photos.'.format(len(pks)))
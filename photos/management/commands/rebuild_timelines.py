@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import MyUser
+from photos.models import TimelineEntry
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the materialized timelines of every user, or of the '
+            'given usernames, from the photos they currently follow.')
+    args = '[username ...]'
+
+    def handle(self, *usernames, **options):
+        users = MyUser.objects.all()
+        if usernames:
+            users = users.filter(username__in=usernames)
+
+        for user in users.iterator():
+            TimelineEntry.objects.rebuild(user)
+        self.stdout.write('Rebuilt {} timelines.'.format(users.count()))
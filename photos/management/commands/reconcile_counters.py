@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Follower
+from hashtags.models import Hashtag
+from photos.models import Photo
+
+
+class Command(BaseCommand):
+    help = ('Recounts the denormalized like, comment, follower and hashtag '
+            'usage counters and fixes any that drifted.')
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.reconcile_counters()
+        followers = Follower.objects.reconcile_counters()
+        hashtags = Hashtag.objects.reconcile_counters()
+        self.stdout.write('Fixed {} photo, {} follower and {} hashtag '
+                          'counters.'.format(photos, followers, hashtags))
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('photos', '0004_auto_20150831_1129'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField()),
+                ('owner', models.ForeignKey(related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+                ('photo', models.ForeignKey(to='photos.Photo')),
+            ],
+            options={
+                'ordering': ['-created'],
+                'verbose_name_plural': 'Timeline entries',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together=set([('owner', 'photo')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='timelineentry',
+            index_together=set([('owner', 'created')]),
+        ),
+    ]
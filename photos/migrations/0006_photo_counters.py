@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Photo = apps.get_model('photos', 'Photo')
+    counts = Photo.objects.annotate(
+        the_likes=Count('likers', distinct=True),
+        the_comments=Count('comment', distinct=True)).values_list(
+            'pk', 'the_likes', 'the_comments')
+    for pk, likes, comments in counts:
+        if likes or comments:
+            Photo.objects.filter(pk=pk).update(likes_count=likes,
+                                               comments_count=comments)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0005_timelineentry'),
+        ('comments', '0005_auto_20150831_1101'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, db_index=True),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
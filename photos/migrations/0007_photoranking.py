@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0006_photo_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoRanking',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('category', models.ForeignKey(related_name='rankings', blank=True, to='photos.Category', null=True)),
+                ('photo', models.ForeignKey(related_name='rankings', to='photos.Photo')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='photoranking',
+            index_together=set([('category', 'rank')]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0007_photoranking'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='photo',
+            index_together=set([('created', 'id')]),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import photos.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0008_photo_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='feed',
+            field=models.ImageField(upload_to=photos.models.rendition_location, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='height',
+            field=models.PositiveIntegerField(null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='retina',
+            field=models.ImageField(upload_to=photos.models.rendition_location, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='thumbnail',
+            field=models.ImageField(upload_to=photos.models.rendition_location, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='width',
+            field=models.PositiveIntegerField(null=True, editable=False, blank=True),
+        ),
+    ]
@@ -1,44 +1,168 @@
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db import models
-from django.db.models import Count
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Q
 
 from datetime import datetime, timedelta
 
+from accounts.graph import follower_ids, following_ids
+from accounts.models import Follower
 from core.models import TimeStampedModel
 from hashtags.models import HashtagMixin
 
 # Create your models here.
 
 
+# the ``limit`` newest active photos of each creator, with their count
+NEWEST_PER_CREATOR_SQL = """
+    SELECT * FROM (
+        SELECT id, creator_id, photo, thumbnail, created,
+               ROW_NUMBER() OVER (PARTITION BY creator_id
+                                  ORDER BY created DESC, id DESC) AS the_rank,
+               COUNT(*) OVER (PARTITION BY creator_id) AS the_count
+        FROM {table}
+        WHERE is_active AND creator_id = ANY(%s)
+    ) AS ranked
+    WHERE the_rank <= %s
+    ORDER BY creator_id, the_rank"""
+
+
 def upload_location(instance, filename):
     return "{}/photos/{}".format(instance.creator.username, filename)
 
 
+def rendition_location(instance, filename):
+    return "{}/photos/renditions/{}".format(instance.creator.username,
+                                            filename)
+
+
 class PhotoManager(models.Manager):
     def category_detail(self, obj):
+        if PhotoRanking.objects.exists():
+            return self.trending(category=obj)
+        date_from = datetime.now() - timedelta(days=21)
+        return super(PhotoManager, self).get_queryset().filter(
+            is_active=True, created__gte=date_from,
+            category=obj).order_by('-likes_count')
+
+    def top_per_category(self, categories, limit):
+        """
+        Returns the best ``limit`` photos of each of ``categories`` keyed by
+        category id, read from the ranking table with a single query.
+        """
+        top = dict((category.pk, []) for category in categories)
+        if PhotoRanking.objects.exists():
+            rankings = PhotoRanking.objects.filter(
+                category__in=top.keys(), rank__lte=limit,
+                photo__is_active=True).select_related(
+                    'photo__creator', 'photo__category').order_by(
+                        'category', 'rank')
+            for ranking in rankings:
+                top[ranking.category_id].append(ranking.photo)
+            return top
+
+        # not ranked yet, same window as ``category_detail``
         date_from = datetime.now() - timedelta(days=21)
-        return super(PhotoManager, self).get_queryset().annotate(
-            the_count=(Count('likers'))).filter(
-                is_active=True, created__gte=date_from,
-                category=obj).order_by('-the_count')
+        photos = super(PhotoManager, self).get_queryset().filter(
+            is_active=True, created__gte=date_from,
+            category__in=top.keys()).select_related(
+                'creator', 'category').order_by('-likes_count')
+        for photo in photos:
+            if len(top[photo.category_id]) < limit:
+                top[photo.category_id].append(photo)
+        return top
+
+    def newest_per_creator(self, creator_ids, limit):
+        """
+        Returns, keyed by creator id, the number of active photos of each
+        of ``creator_ids`` and their ``limit`` newest ones, with a single
+        query. PostgreSQL ranks the photos with window functions so that
+        at most ``limit`` rows per creator are loaded; other backends load
+        the creators' photos and trim them here.
+        """
+        newest = dict((pk, (0, [])) for pk in creator_ids)
+        if not newest:
+            return newest
+
+        if connection.vendor == 'postgresql':
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            photos = self.raw(NEWEST_PER_CREATOR_SQL.format(table=table),
+                              [list(newest), limit])
+        else:
+            photos = super(PhotoManager, self).get_queryset().filter(
+                creator__in=list(newest), is_active=True).only(
+                    'creator', 'photo', 'thumbnail', 'created').order_by(
+                        '-created', '-id')
+
+        for photo in photos:
+            count, loaded = newest[photo.creator_id]
+            if len(loaded) < limit:
+                loaded.append(photo)
+            # the ranked rows carry the creator's count
+            newest[photo.creator_id] = (
+                getattr(photo, 'the_count', count + 1), loaded)
+        return newest
 
     def most_commented(self):
-        return super(PhotoManager, self).get_queryset().annotate(
-            the_count=(Count('comment'))).filter(
-                is_active=True).order_by('-the_count')
+        return super(PhotoManager, self).get_queryset().filter(
+            is_active=True).order_by('-comments_count')
 
     def most_liked(self):
-        return super(PhotoManager, self).get_queryset().annotate(
-            the_count=(Count('likers'))).filter(
-                is_active=True).order_by('-the_count')
+        return super(PhotoManager, self).get_queryset().filter(
+            is_active=True).order_by('-likes_count')
 
     def most_liked_offset(self):
+        if PhotoRanking.objects.exists():
+            return self.trending()
         date_from = datetime.now() - timedelta(days=21)
-        return super(PhotoManager, self).get_queryset().annotate(
-            the_count=(Count('likers'))).filter(
-                is_active=True, created__gte=date_from).order_by(
-                    '-the_count')
+        return super(PhotoManager, self).get_queryset().filter(
+            is_active=True, created__gte=date_from).order_by('-likes_count')
+
+    def trending(self, category=None):
+        """
+        Photos in the order precomputed by ``PhotoRanking.objects.refresh``,
+        either globally or for a single category.
+        """
+        if category is None:
+            # ``rankings__category=None`` would also match the photos with
+            # no ranking row at all through the outer join
+            lookups = {'rankings__category__isnull': True,
+                       'rankings__rank__isnull': False}
+        else:
+            lookups = {'rankings__category': category}
+        return super(PhotoManager, self).get_queryset().filter(
+            is_active=True, **lookups).order_by('rankings__rank')
+
+    def tagged(self, hashtag, before=None, limit=200):
+        """
+        Newest first photos tagged with ``hashtag`` either directly or in
+        one of their comments, read from the hashtag relations. ``before``
+        is the id of the last photo of the previous page.
+        """
+        pks = set()
+        for lookup in ('hashtags', 'comment__hashtags'):
+            queryset = super(PhotoManager, self).get_queryset().filter(
+                is_active=True, **{lookup: hashtag})
+            if before is not None:
+                queryset = queryset.filter(pk__lt=before)
+            pks.update(queryset.order_by('-pk').values_list(
+                'pk', flat=True).distinct()[:limit])
+
+        pks = sorted(pks, reverse=True)[:limit]
+        photos = super(PhotoManager, self).get_queryset().select_related(
+            'category', 'creator').in_bulk(pks)
+        return [photos[pk] for pk in pks if pk in photos]
+
+    def liked_ids(self, user, photos):
+        """
+        The pks of the ``photos`` liked by ``user``, in one query, so the
+        shared photo fragments can be cached without per-viewer state.
+        """
+        if not user.is_authenticated():
+            return set()
+        return set(Photo.likers.through.objects.filter(
+            myuser=user, photo__in=[photo.pk for photo in photos]
+        ).values_list('photo_id', flat=True))
 
     def own(self, user):
         return super(PhotoManager, self).get_queryset().select_related(
@@ -46,8 +170,24 @@ class PhotoManager(models.Manager):
 
     def following(self, user):
         return super(PhotoManager, self).get_queryset().select_related(
-            'creator').filter(
-                creator__follower__in=user.follower.following.all())
+            'creator').filter(creator__in=following_ids(user))
+
+    def reconcile_counters(self):
+        """
+        Resets ``likes_count`` and ``comments_count`` on every photo whose
+        counter drifted from the rows it counts. Returns the number of
+        counters fixed.
+        """
+        fixed = 0
+        for field, related in (('likes_count', 'likers'),
+                               ('comments_count', 'comment')):
+            drifted = super(PhotoManager, self).get_queryset().annotate(
+                the_count=(Count(related))).exclude(
+                    **{field: F('the_count')}).values_list('pk', 'the_count')
+            for pk, count in drifted:
+                self.filter(pk=pk).update(**{field: count})
+                fixed += 1
+        return fixed
 
 
 class Photo(HashtagMixin, TimeStampedModel):
@@ -60,15 +200,31 @@ class Photo(HashtagMixin, TimeStampedModel):
     featured = models.BooleanField(default=False)
     likers = models.ManyToManyField(settings.AUTH_USER_MODEL,
                                     related_name='likers', blank=True)
+    likes_count = models.PositiveIntegerField(default=0, db_index=True,
+                                              editable=False)
+    comments_count = models.PositiveIntegerField(default=0, db_index=True,
+                                                 editable=False)
     photo = models.ImageField(upload_to=upload_location)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True,
+                                         editable=False)
+    # smaller copies generated by ``photos.tasks.generate_renditions``
+    thumbnail = models.ImageField(upload_to=rendition_location, blank=True,
+                                  editable=False)
+    feed = models.ImageField(upload_to=rendition_location, blank=True,
+                             editable=False)
+    retina = models.ImageField(upload_to=rendition_location, blank=True,
+                               editable=False)
     slug = models.SlugField()
 
     hashtag_text_field = 'description'
+    hashtag_html_field = 'hashtag_enabled_description'
 
     objects = PhotoManager()
 
     class Meta:
         unique_together = ('slug', 'category',)
+        index_together = [['created', 'id']]
         ordering = ['-created']
         app_label = 'photos'
 
@@ -82,6 +238,21 @@ class Photo(HashtagMixin, TimeStampedModel):
     def get_photo_url(self):
         return "{}{}".format(settings.MEDIA_URL, self.photo)
 
+    def _get_rendition_url(self, rendition):
+        # the original is served until the renditions are generated
+        if not rendition:
+            return self.get_photo_url()
+        return "{}{}".format(settings.MEDIA_URL, rendition)
+
+    def get_thumbnail_url(self):
+        return self._get_rendition_url(self.thumbnail)
+
+    def get_feed_url(self):
+        return self._get_rendition_url(self.feed)
+
+    def get_retina_url(self):
+        return self._get_rendition_url(self.retina)
+
     def get_delete_url(self):
         return reverse('delete_photo', kwargs={"pk": self.pk})
 
@@ -89,7 +260,7 @@ class Photo(HashtagMixin, TimeStampedModel):
         return map(str, self.likers.all().values_list('username', flat=True))
 
     def like_count(self):
-        return self.likers.count()
+        return self.likes_count
 
 
 class CategoryManager(models.Manager):
@@ -123,3 +294,196 @@ class Category(TimeStampedModel):
 
     def get_absolute_url(self):
         return reverse("category_detail", kwargs={"cat_slug": self.slug})
+
+
+class TimelineEntryManager(models.Manager):
+    def _high_fanout_creators(self, user):
+        """
+        Users followed by ``user`` whose photos are not fanned out on write
+        because they have more than TIMELINE_FANOUT_LIMIT followers.
+        """
+        return Follower.objects.filter(
+            followers__user=user,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).values_list(
+                'user', flat=True)
+
+    def _is_high_fanout(self, user):
+        return Follower.objects.filter(
+            user=user,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).exists()
+
+    def fan_out(self, photo):
+        """
+        Pushes a new photo onto its creator's timeline and onto the
+        timeline of everyone following the creator. Creators with a huge
+        following only get their own entry; their photos are merged in
+        when a follower reads the timeline instead.
+        """
+        owners = [photo.creator_id]
+        if not self._is_high_fanout(photo.creator_id):
+            owners.extend(follower_ids(photo.creator_id))
+
+        self.bulk_create([
+            self.model(owner_id=owner, photo=photo, created=photo.created)
+            for owner in set(owners)
+        ], batch_size=500)
+
+    def follow(self, user, followed):
+        """
+        Copies the most recent photos of ``followed`` onto the timeline
+        of ``user``.
+        """
+        if self._is_high_fanout(followed):
+            return
+
+        existing = self.filter(owner=user).values_list('photo', flat=True)
+        photos = Photo.objects.filter(creator=followed).exclude(
+            pk__in=existing).values_list('pk', 'created')
+        self.bulk_create([
+            self.model(owner=user, photo_id=pk, created=created)
+            for pk, created in photos[:settings.TIMELINE_SIZE]
+        ], batch_size=500)
+
+    def unfollow(self, user, followed):
+        self.filter(owner=user, photo__creator=followed).delete()
+
+    def rebuild(self, user):
+        """
+        Rebuilds the timeline of ``user`` from scratch using the
+        fan-out-on-read queries.
+        """
+        self.filter(owner=user).delete()
+        photos = Photo.objects.own(user)
+        if Follower.objects.filter(user=user).exists():
+            photos = (photos | Photo.objects.following(user)).exclude(
+                creator__in=self._high_fanout_creators(user)).distinct()
+        self.bulk_create([
+            self.model(owner=user, photo_id=pk, created=created)
+            for pk, created in photos.order_by('-created').values_list(
+                'pk', 'created')[:settings.TIMELINE_SIZE]
+        ], batch_size=500)
+
+    def trim(self):
+        """
+        Deletes the entries of every timeline beyond its TIMELINE_SIZE
+        newest ones, the most ``photos_for`` reads. Fan-out and follows
+        only ever add entries.
+        """
+        size = settings.TIMELINE_SIZE
+        owners = list(self.order_by().values('owner').annotate(
+            the_count=Count('pk')).filter(the_count__gt=size).values_list(
+                'owner', flat=True))
+        for owner in owners:
+            created, pk = self.filter(owner=owner).order_by(
+                '-created', '-id').values_list('created', 'id')[size - 1]
+            self.filter(Q(created__lt=created) | Q(created=created,
+                                                   pk__lt=pk),
+                        owner=owner).delete()
+
+    def photos_for(self, user, limit=None):
+        """
+        Returns the newest photos on the timeline of ``user``: a bounded
+        read of the materialized entries, merged with the photos of any
+        high-fanout creators they follow, hydrated with a single in_bulk.
+        """
+        limit = limit or settings.TIMELINE_SIZE
+        entries = list(self.filter(owner=user).values_list(
+            'photo', 'created')[:limit])
+
+        high_fanout = list(self._high_fanout_creators(user))
+        if high_fanout:
+            entries.extend(Photo.objects.filter(
+                creator__in=high_fanout).values_list(
+                    'pk', 'created')[:limit])
+            entries = sorted(set(entries), key=lambda entry: entry[1],
+                             reverse=True)[:limit]
+
+        photos = Photo.objects.filter(is_active=True).select_related(
+            'category', 'creator').in_bulk([pk for pk, created in entries])
+        return [photos[pk] for pk, created in entries if pk in photos]
+
+
+class TimelineEntry(models.Model):
+    """
+    A photo materialized onto a user's timeline. ``created`` mirrors the
+    photo's creation date so timelines can be read in order without a join.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL,
+                              related_name='timeline_entries')
+    photo = models.ForeignKey(Photo)
+    created = models.DateTimeField()
+
+    objects = TimelineEntryManager()
+
+    class Meta:
+        app_label = 'photos'
+        ordering = ['-created']
+        unique_together = ('owner', 'photo',)
+        index_together = [['owner', 'created']]
+        verbose_name_plural = 'Timeline entries'
+
+    def __unicode__(self):
+        return u"{}: {}".format(self.owner_id, self.photo_id)
+
+
+def decay_score(likes, created, now):
+    """
+    Hacker News style ranking: likes decay with the photo's age in hours,
+    faster the higher RANKING_GRAVITY is.
+    """
+    age = (now - created).total_seconds() / 3600.0
+    return likes / pow(age + 2, settings.RANKING_GRAVITY)
+
+
+class PhotoRankingManager(models.Manager):
+    def refresh(self):
+        """
+        Scores every recent active photo and replaces the ranking table
+        with the top RANKING_SIZE photos overall and per category.
+        """
+        now = datetime.now()
+        date_from = now - timedelta(days=settings.RANKING_WINDOW_DAYS)
+        candidates = Photo.objects.filter(
+            is_active=True, created__gte=date_from).values_list(
+                'pk', 'category', 'likes_count', 'created')
+        scored = sorted(
+            ((decay_score(likes, created, now), created, pk, category)
+             for pk, category, likes, created in candidates),
+            reverse=True)
+
+        rankings = []
+        ranks = {}
+        for score, created, pk, category in scored:
+            for key in (None, category):
+                rank = ranks.get(key, 0) + 1
+                if rank > settings.RANKING_SIZE:
+                    continue
+                ranks[key] = rank
+                rankings.append(self.model(category_id=key, photo_id=pk,
+                                           rank=rank, score=score))
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rankings, batch_size=500)
+
+
+class PhotoRanking(models.Model):
+    """
+    A photo's position in the trending ranking, globally when
+    ``category`` is null or within ``category`` otherwise.
+    """
+    category = models.ForeignKey(Category, null=True, blank=True,
+                                 related_name='rankings')
+    photo = models.ForeignKey(Photo, related_name='rankings')
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    objects = PhotoRankingManager()
+
+    class Meta:
+        app_label = 'photos'
+        ordering = ['rank']
+        index_together = [['category', 'rank']]
+
+    def __unicode__(self):
+        return u"{}: {}".format(self.rank, self.photo_id)
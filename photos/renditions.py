@@ -0,0 +1,75 @@
+"""
+Resized copies of uploaded photos.
+
+Every rendition is auto-rotated from the EXIF orientation, saved without
+the rest of the EXIF data and encoded as a progressive JPEG, so browsers
+can start drawing it before it has fully downloaded.
+"""
+import os
+
+from PIL import Image
+from pilkit.processors import ResizeToFill, ResizeToFit, Transpose
+from pilkit.utils import img_to_fobj
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+RENDITIONS = ('thumbnail', 'feed', 'retina')
+
+
+def get_processor(rendition):
+    width, height = settings.PHOTO_RENDITIONS[rendition]
+    if rendition == 'thumbnail':
+        return ResizeToFill(width, height)
+    return ResizeToFit(width, height, upscale=False)
+
+
+def open_image(field_file):
+    field_file.open('rb')
+    try:
+        image = Image.open(field_file)
+        image.load()
+    finally:
+        field_file.close()
+    return Transpose().process(image)
+
+
+def verify(field_file, image):
+    """
+    Raises ``ValueError`` if the photo is outside the limits enforced on
+    uploads.
+    """
+    width, height = image.size
+    if field_file.size > settings.PHOTO_UPLOAD_MAX_SIZE:
+        raise ValueError('Photo exceeds the maximum file size.')
+    if (width < settings.PHOTO_MIN_WIDTH or
+            height < settings.PHOTO_MIN_HEIGHT or
+            height > settings.PHOTO_MAX_HEIGHT):
+        raise ValueError('Photo dimensions are out of bounds.')
+
+
+def encode(image):
+    return img_to_fobj(image, 'JPEG', quality=settings.PHOTO_RENDITION_QUALITY,
+                       optimize=True, progressive=True).read()
+
+
+def generate_renditions(photo):
+    """
+    Saves every rendition of ``photo`` to storage and returns the values
+    of the fields to update: the rendition names and the dimensions of
+    the original. Raises ``IOError`` if the file is not an image and
+    ``ValueError`` if it fails verification.
+    """
+    original = open_image(photo.photo)
+    verify(photo.photo, original)
+    width, height = original.size
+    fields = {'width': width, 'height': height}
+
+    name = os.path.splitext(os.path.basename(photo.photo.name))[0]
+    for rendition in RENDITIONS:
+        image = get_processor(rendition).process(original)
+        field_file = getattr(photo, rendition)
+        field_file.save('{}_{}.jpg'.format(name, rendition),
+                        ContentFile(encode(image)), save=False)
+        fields[rendition] = field_file.name
+    return fields
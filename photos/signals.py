@@ -1,23 +1,47 @@
-from django.core.cache import cache
-from django.db.models.signals import post_save, pre_save
+import logging
+
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.template.loader import render_to_string
 
-from .models import Photo
+from core.cache import invalidate
+
+from .models import Photo, TimelineEntry
+from .tasks import generate_photo_renditions
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Photo)
+def invalidate_cache(sender, instance, created, **kwargs):
+    if created:
+        # pages listing the creator's or the category's photos
+        invalidate(instance, instance.creator, instance.category)
+    else:
+        invalidate(instance)
+
+
+@receiver(post_delete, sender=Photo)
+def invalidate_deleted(sender, instance, **kwargs):
+    invalidate(instance, instance.creator, instance.category)
 
 
 @receiver(post_save, sender=Photo)
-def clear_cache(sender, instance, created, **kwargs):
-    cache._cache.flush_all()
+def fan_out_timeline(sender, instance, created, **kwargs):
+    # direct uploads are fanned out once verified
+    if created and instance.is_active:
+        TimelineEntry.objects.fan_out(instance)
 
 
-@receiver(pre_save, sender=Photo)
-def process_hashtags(sender, instance, **kwargs):
-    html = []
-    for word in instance.hashtag_field.value_to_string(instance).split():
-        if word.startswith('#'):
-            word = render_to_string('hashtags/_link.html',
-                                    {'hashtag': word.lower()[1:]})
+@receiver(post_save, sender=Photo)
+def queue_renditions(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        generate_photo_renditions.delay(instance.pk)
+    except Exception:
+        # the photo is saved already; the generate_renditions command
+        # queues whatever was missed once the broker is back
+        logger.exception('Could not queue the renditions of photo %s.',
+                         instance.pk)
 
-        html.append(word)
-        instance.hashtag_enabled_description = ' '.join(html)
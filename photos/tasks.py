@@ -0,0 +1,50 @@
+from __future__ import absolute_import
+
+import logging
+
+from celery import shared_task
+
+from django.utils import timezone
+
+from core.cache import invalidate
+
+from .models import Photo, PhotoRanking, TimelineEntry
+from .renditions import generate_renditions
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_photo_rankings():
+    PhotoRanking.objects.refresh()
+
+
+@shared_task
+def trim_timelines():
+    TimelineEntry.objects.trim()
+
+
+@shared_task
+def generate_photo_renditions(photo_id):
+    """
+    Verifies a new photo and generates its renditions. Direct uploads are
+    created inactive and only published once they pass verification.
+    """
+    photo = Photo.objects.select_related('creator').filter(pk=photo_id).first()
+    if photo is None:
+        return
+    try:
+        fields = generate_renditions(photo)
+    except (IOError, ValueError):
+        logger.warning('Photo %s failed verification.', photo_id,
+                       exc_info=True)
+        return
+
+    # update() so the hashtag, timeline and cache signals don't run
+    # again; bumping modified also expires the cached photo cards
+    Photo.objects.filter(pk=photo_id).update(
+        is_active=True, modified=timezone.now(), **fields)
+    if not photo.is_active:
+        TimelineEntry.objects.fan_out(photo)
+    invalidate(photo, photo.creator, photo.category)
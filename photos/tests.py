@@ -1,3 +1,234 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from io import BytesIO
+
+from PIL import Image
+
+from django.core.files.base import ContentFile
+from django.core.urlresolvers import reverse
+from django.test import Client, TestCase, override_settings
+
+from accounts import graph
+from accounts.models import MyUser
+from hashtags.models import Hashtag
+from .models import Category, Photo, PhotoRanking, TimelineEntry
+
+
+def make_user(username='testuser', email='test@user.com', password='testuser'):
+    return MyUser.objects.create_user(username=username, email=email,
+        password=password)
+
+
+def make_photo(creator, category, slug):
+    return Photo.objects.create(creator=creator, category=category,
+        slug=slug, photo='{}/photos/{}.jpg'.format(creator.username, slug))
+
+
+def follow(user, followed):
+    graph.follow(user, [followed])
+
+
+class TimelineEntryUnitTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='Art', slug='art')
+        self.reader = make_user()
+        self.creator = make_user(username='creator', email='c@user.com')
+        follow(self.reader, self.creator)
+
+    def test_new_photo_fanned_out_to_followers(self):
+        photo = make_photo(self.creator, self.category, 'first')
+
+        self.assertEqual(TimelineEntry.objects.photos_for(self.reader),
+            [photo], "A new photo should appear on the timeline of the "
+            "creator's followers.")
+        self.assertEqual(TimelineEntry.objects.photos_for(self.creator),
+            [photo], "A new photo should appear on its creator's timeline.")
+
+    def test_timeline_sorted_newest_first(self):
+        first = make_photo(self.creator, self.category, 'first')
+        second = make_photo(self.creator, self.category, 'second')
+
+        self.assertEqual(TimelineEntry.objects.photos_for(self.reader),
+            [second, first], "Timeline should be sorted newest first.")
+
+    def test_follow_and_unfollow_update_timeline(self):
+        other = make_user(username='other', email='o@user.com')
+        photo = make_photo(other, self.category, 'other')
+        self.assertNotIn(photo, TimelineEntry.objects.photos_for(self.reader))
+
+        TimelineEntry.objects.follow(self.reader, other)
+        self.assertIn(photo, TimelineEntry.objects.photos_for(self.reader),
+            "Following a user should backfill their recent photos.")
+
+        TimelineEntry.objects.unfollow(self.reader, other)
+        self.assertNotIn(photo, TimelineEntry.objects.photos_for(self.reader),
+            "Unfollowing a user should remove their photos.")
+
+    def test_trim_keeps_the_newest_entries(self):
+        photos = [make_photo(self.creator, self.category, 'photo{}'.format(i))
+                  for i in range(3)]
+
+        with override_settings(TIMELINE_SIZE=2):
+            TimelineEntry.objects.trim()
+
+        self.assertEqual(list(TimelineEntry.objects.filter(
+            owner=self.reader).values_list('photo', flat=True)),
+            [photos[2].pk, photos[1].pk], 'only the newest TIMELINE_SIZE '
+            'entries of a timeline should be kept.')
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_high_fanout_creator_merged_on_read(self):
+        photo = make_photo(self.creator, self.category, 'first')
+
+        self.assertFalse(TimelineEntry.objects.filter(
+            owner=self.reader).exists(), "Photos of high-fanout creators "
+            "should not be fanned out on write.")
+        self.assertEqual(TimelineEntry.objects.photos_for(self.reader),
+            [photo], "Photos of high-fanout creators should be merged in "
+            "on read.")
+
+
+class PhotoTaggedUnitTest(TestCase):
+
+    def test_inactive_photos_left_out(self):
+        category = Category.objects.create(title='Art', slug='art')
+        creator = make_user()
+        published = Photo.objects.create(creator=creator, category=category,
+            slug='published', photo='published.jpg', description='#cool')
+        Photo.objects.create(creator=creator, category=category,
+            slug='processing', photo='processing.jpg', description='#cool',
+            is_active=False)
+
+        self.assertEqual(Photo.objects.tagged(Hashtag.objects.get(
+            tag='cool')), [published], 'unpublished uploads should not be '
+            'listed on hashtag pages.')
+
+
+class NewestPerCreatorUnitTest(TestCase):
+
+    def test_counts_all_and_loads_the_newest(self):
+        category = Category.objects.create(title='Art', slug='art')
+        creator = make_user()
+        idle = make_user(username='idle', email='idle@user.com')
+        photos = [make_photo(creator, category, 'photo{}'.format(i))
+                  for i in range(4)]
+
+        newest = Photo.objects.newest_per_creator([creator.pk, idle.pk], 3)
+
+        count, loaded = newest[creator.pk]
+        self.assertEqual(count, 4)
+        self.assertEqual([photo.pk for photo in loaded],
+                         [photo.pk for photo in photos[:0:-1]])
+        self.assertEqual(newest[idle.pk], (0, []))
+
+    def test_full_page_of_creators(self):
+        # more bind parameters than SQLite allows would fail here
+        newest = Photo.objects.newest_per_creator(range(1, 301), 3)
+
+        self.assertEqual(len(newest), 300)
+
+
+class PhotoCountersFunctionalTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.category = Category.objects.create(title='Art', slug='art')
+        self.creator = make_user(username='creator', email='c@user.com')
+        self.photo = make_photo(self.creator, self.category, 'first')
+        make_user()
+        self.client.login(username='testuser', password='testuser')
+
+    def test_like_ajax_updates_likes_count(self):
+        response = self.client.post(reverse('like_ajax'),
+            {'photo_pk': self.photo.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).likes_count, 1,
+            "Liking a photo should increment its likes_count.")
+
+        self.client.post(reverse('like_ajax'), {'photo_pk': self.photo.pk})
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).likes_count, 0,
+            "Unliking a photo should decrement its likes_count.")
+
+    def test_reconcile_counters_fixes_drift(self):
+        Photo.objects.filter(pk=self.photo.pk).update(likes_count=7)
+
+        Photo.objects.reconcile_counters()
+
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).likes_count, 0,
+            "reconcile_counters should reset drifted counters.")
+
+
+class PhotoRankingUnitTest(TestCase):
+
+    def setUp(self):
+        self.art = Category.objects.create(title='Art', slug='art')
+        self.music = Category.objects.create(title='Music', slug='music')
+        creator = make_user()
+        self.popular = make_photo(creator, self.art, 'popular')
+        self.quiet = make_photo(creator, self.art, 'quiet')
+        self.other = make_photo(creator, self.music, 'other')
+        Photo.objects.filter(pk=self.popular.pk).update(likes_count=10)
+        Photo.objects.filter(pk=self.other.pk).update(likes_count=5)
+
+    def test_refresh_ranks_globally_and_per_category(self):
+        PhotoRanking.objects.refresh()
+
+        self.assertEqual(list(Photo.objects.most_liked_offset()),
+            [self.popular, self.other, self.quiet])
+        self.assertEqual(list(Photo.objects.category_detail(self.art)),
+            [self.popular, self.quiet])
+        self.assertEqual(list(Photo.objects.category_detail(self.music)),
+            [self.other])
+
+    def test_unranked_photos_are_not_trending(self):
+        PhotoRanking.objects.refresh()
+        # posted after the refresh, so it has no ranking row yet
+        make_photo(make_user(username='late', email='late@user.com'),
+                   self.art, 'late')
+
+        self.assertEqual(list(Photo.objects.trending()),
+            [self.popular, self.other, self.quiet])
+
+
+class PhotoRenditionsFunctionalTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.category = Category.objects.create(title='Art', slug='art')
+        self.creator = make_user()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, size):
+        image = BytesIO()
+        Image.new('RGB', size).save(image, 'PNG')
+        photo = Photo(creator=self.creator, category=self.category,
+                      slug='upload', is_active=False)
+        photo.photo.save('upload.png', ContentFile(image.getvalue()),
+                         save=False)
+        # post_save queues the renditions, run in process while testing
+        photo.save()
+        return Photo.objects.get(pk=photo.pk)
+
+    def test_renditions_generated_and_photo_published(self):
+        photo = self.upload((400, 300))
+
+        self.assertTrue(photo.is_active, 'a verified upload should be '
+            'published.')
+        self.assertEqual((photo.width, photo.height), (400, 300))
+        for rendition in ('thumbnail', 'feed', 'retina'):
+            field_file = getattr(photo, rendition)
+            self.assertTrue(field_file.storage.exists(field_file.name),
+                '{} was not saved.'.format(rendition))
+
+    def test_undersized_upload_not_published(self):
+        photo = self.upload((20, 20))
+
+        self.assertFalse(photo.is_active)
+        self.assertEqual(photo.thumbnail.name, '')
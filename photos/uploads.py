@@ -0,0 +1,99 @@
+"""
+Direct photo uploads.
+
+Clients ask for an upload ticket, PUT the file straight to storage and
+then finalize the upload to create the ``Photo``. With S3 the ticket
+holds a pre-signed S3 URL; with any other storage it points at
+``photos.views.upload_direct``, which streams the body to storage.
+"""
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+from django.utils.crypto import get_random_string
+
+UPLOAD_SALT = 'photos.uploads'
+EXTENSIONS = {
+    'image/gif': '.gif',
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+}
+
+
+def make_key(user, content_type):
+    return '{}/photos/{}{}'.format(user.username, get_random_string(20),
+                                   EXTENSIONS[content_type])
+
+
+def sign_upload(user, key):
+    return signing.dumps({'user': user.pk, 'key': key}, salt=UPLOAD_SALT)
+
+
+def read_upload(token, user=None):
+    """
+    Returns the storage key of a signed upload token, raising
+    ``signing.BadSignature`` if it was tampered with, has expired or
+    belongs to someone other than ``user``.
+    """
+    data = signing.loads(token, salt=UPLOAD_SALT,
+                         max_age=settings.PHOTO_UPLOAD_EXPIRY)
+    if user is not None and data['user'] != user.pk:
+        raise signing.BadSignature('Upload belongs to another user.')
+    return data['key']
+
+
+def get_presigned_url(key, content_type):
+    # only S3 storages can hand out URLs clients upload to themselves
+    connection = getattr(default_storage, 'connection', None)
+    if connection is None:
+        return None
+    name = default_storage._normalize_name(default_storage._clean_name(key))
+    return connection.generate_url(
+        settings.PHOTO_UPLOAD_EXPIRY, 'PUT',
+        bucket=default_storage.bucket_name, key=name,
+        headers={'Content-Type': content_type})
+
+
+def create_ticket(user, content_type, request=None):
+    """
+    Returns where and how to upload a photo of ``content_type``, and the
+    token to finalize the upload with.
+    """
+    key = make_key(user, content_type)
+    upload = sign_upload(user, key)
+    url = get_presigned_url(key, content_type)
+    if url is None:
+        url = reverse('upload_direct', kwargs={'upload': upload})
+        if request is not None:
+            url = request.build_absolute_uri(url)
+    return {
+        'upload': upload,
+        'url': url,
+        'method': 'PUT',
+        'headers': {'Content-Type': content_type},
+        'max_size': settings.PHOTO_UPLOAD_MAX_SIZE,
+    }
+
+
+class UploadStream(object):
+    """
+    Wraps a request so storages can read its body in chunks instead of
+    loading the whole file into memory.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, request, name):
+        self.request = request
+        self.name = os.path.basename(name)
+
+    def chunks(self, chunk_size=None):
+        while True:
+            chunk = self.request.read(chunk_size or self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def read(self, size=-1):
+        return self.request.read(size)
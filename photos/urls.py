@@ -10,4 +10,6 @@ urlpatterns = patterns('photos.views',
         name="delete_photo"),
     url(r'^like/$', 'like_ajax', name='like_ajax'),
     url(r'^upload/$', 'photo_upload', name='photo_upload'),
+    url(r'^upload/(?P<upload>[\w:.-]+)/$', 'upload_direct',
+        name='upload_direct'),
 )
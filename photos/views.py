@@ -1,19 +1,26 @@
 import random
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core import signing
+from django.core.files.storage import default_storage
 from django.core.urlresolvers import reverse, reverse_lazy
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, HttpResponseRedirect, render
 from django.utils.crypto import get_random_string
-from django.views.decorators.cache import cache_page
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.views.generic.edit import DeleteView
 
+from core.cache import cache_page_depends, depends_on
 from notifications.signals import notify
 
 from .forms import PhotoUploadForm
 from .models import Category, Photo
+from .uploads import read_upload, UploadStream
 
 # Create your views here.
 
@@ -23,15 +30,24 @@ from .models import Category, Photo
 def like_ajax(request):
     user = request.user
     photo_pk = request.POST.get('photo_pk')
-    photo = get_object_or_404(Photo, pk=photo_pk)
-
-    if user in photo.likers.all():
-        photo.likers.remove(user)
-        viewer_has_liked = False
-    else:
-        photo.likers.add(user)
-        viewer_has_liked = True
 
+    with transaction.atomic():
+        # the row lock serializes toggles, so a double click can't count
+        # the same like twice
+        photo = get_object_or_404(Photo.objects.select_for_update(),
+                                  pk=photo_pk)
+        if photo.likers.filter(pk=user.pk).exists():
+            photo.likers.remove(user)
+            Photo.objects.filter(pk=photo.pk).update(
+                likes_count=F('likes_count') - 1)
+            viewer_has_liked = False
+        else:
+            photo.likers.add(user)
+            Photo.objects.filter(pk=photo.pk).update(
+                likes_count=F('likes_count') + 1)
+            viewer_has_liked = True
+
+    if viewer_has_liked:
         notify.send(
             user,
             action=photo,
@@ -40,8 +56,10 @@ def like_ajax(request):
             verb='liked'
         )
 
-    photo.save()
-    like_count = photo.likers.count()
+    # only touch ``modified`` so the stale counter isn't written back
+    photo.save(update_fields=['modified'])
+    like_count = Photo.objects.filter(pk=photo.pk).values_list(
+        'likes_count', flat=True)[0]
 
     data = {
         'viewer_has_liked': viewer_has_liked,
@@ -51,18 +69,20 @@ def like_ajax(request):
 
 
 @login_required
-@cache_page(60 * 2)
+@cache_page_depends(60 * 2)
 def category_detail(request, cat_slug):
     obj = get_object_or_404(Category, slug=cat_slug)
-    categories = Category.objects.most_posts().exclude(id=obj.id)
+    categories = list(Category.objects.most_posts().exclude(id=obj.id))
 
     most_liked = Photo.objects.category_detail(obj)[:600]
     photos = list(most_liked)[:250]
     random.shuffle(photos)
+    depends_on(request, obj, *(categories + photos))
 
     if request.user.is_authenticated():
         context = {
             'categories': categories,
+            'liked_photo_ids': Photo.objects.liked_ids(request.user, photos),
             'obj': obj,
             'photos': photos
         }
@@ -80,7 +100,6 @@ class PhotoDelete(DeleteView):
 
 
 @login_required
-@cache_page(60 * 10)
 def photo_upload(request):
     form = PhotoUploadForm(request.POST or None,
                            request.FILES or None,
@@ -97,3 +116,25 @@ def photo_upload(request):
                              "your picture!")
             return HttpResponseRedirect(reverse('home'))
     return render(request, 'photos/photo_upload.html', {'form': form})
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def upload_direct(request, upload):
+    """
+    Upload target handed out instead of a pre-signed URL when media isn't
+    stored on S3. The signed ``upload`` token authorizes the request.
+    """
+    try:
+        key = read_upload(upload)
+    except signing.BadSignature:
+        return HttpResponseForbidden()
+
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not 0 < length <= settings.PHOTO_UPLOAD_MAX_SIZE:
+        return HttpResponse(status=413)
+    if default_storage.exists(key):
+        return HttpResponse(status=409)
+
+    default_storage.save(key, UploadStream(request, key))
+    return HttpResponse(status=201)
@@ -0,0 +1 @@
+from .signals import reindex_user
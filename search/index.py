@@ -0,0 +1,202 @@
+"""
+In-process prefix index over usernames and full names.
+
+Every process keeps a sorted list of ``(term, kind, pk)`` entries and
+answers prefix queries with a binary search, so names match from the
+start of a word only. Each change to an indexed field bumps a version
+stored in the cache and is logged under it; on its next search every
+process applies the changes it missed. A process only rebuilds its copy
+from the database when it has none yet or the log no longer covers it.
+"""
+import bisect
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.encoding import force_bytes, force_text
+
+from accounts.models import MyUser
+
+
+VERSION_KEY = 'search-index-version'
+RESULTS_KEY = 'search-results:{}:{}:{}'
+CHANGE_KEY = 'search-index-change:{}'
+
+# entry kinds, lower ranks first
+USERNAME = 0
+FULL_NAME = 1
+
+
+def normalize(text):
+    return force_text(text or '').strip().lower()
+
+
+def make_entries(pk, username, full_name):
+    entries = [(normalize(username), USERNAME, pk)]
+    for word in normalize(full_name).split():
+        entries.append((word, FULL_NAME, pk))
+    return entries
+
+
+class UserIndex(object):
+
+    def __init__(self):
+        self.version = None
+        self.indexed = {}
+        self.keys = []
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def build(self, rows, version=None):
+        """
+        Builds the index from ``(pk, username, full_name)`` rows.
+        """
+        entries = []
+        indexed = {}
+        for pk, username, full_name in rows:
+            indexed[pk] = (username, full_name)
+            entries.extend(make_entries(pk, username, full_name))
+        entries.sort()
+        self.swap(entries, indexed, version)
+
+    def update(self, changes, version=None):
+        """
+        Applies ``(pk, row)`` changes, ``row`` being ``(username,
+        full_name)``, or None for users no longer indexed.
+        """
+        entries = list(self.entries)
+        indexed = dict(self.indexed)
+        for pk, row in changes:
+            old = indexed.pop(pk, None)
+            if old is not None:
+                for entry in make_entries(pk, *old):
+                    index = bisect.bisect_left(entries, entry)
+                    if index < len(entries) and entries[index] == entry:
+                        del entries[index]
+            if row is not None:
+                indexed[pk] = row
+                for entry in make_entries(pk, *row):
+                    bisect.insort(entries, entry)
+        self.swap(entries, indexed, version)
+
+    def swap(self, entries, indexed, version):
+        # swap everything at once so concurrent searches never see a
+        # half built index
+        self.keys, self.entries, self.indexed, self.version = (
+            [entry[0] for entry in entries], entries, indexed, version)
+
+    def search(self, query, limit):
+        """
+        Returns the pks of up to ``limit`` users matching ``query``: exact
+        usernames first, then username prefixes, then full name words,
+        shorter usernames first within each group.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        keys, entries, indexed = self.keys, self.entries, self.indexed
+        scores = {}
+        index = bisect.bisect_left(keys, query)
+        while index < len(keys) and keys[index].startswith(query):
+            term, kind, pk = entries[index]
+            score = kind + 1 if term != query or kind else 0
+            if score < scores.get(pk, 3):
+                scores[pk] = score
+            index += 1
+
+        ranked = sorted(scores, key=lambda pk: (
+            scores[pk], len(indexed[pk][0]), indexed[pk][0]))
+        return ranked[:limit]
+
+    def is_stale(self, instance):
+        return self.indexed.get(instance.pk) != (
+            (instance.username, instance.full_name)
+            if instance.is_active else None)
+
+
+user_index = UserIndex()
+
+
+def get_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+        return 1
+
+
+def record_change(pk, row=None):
+    """
+    Logs the new ``(username, full_name)`` of user ``pk``, or its removal
+    when ``row`` is None, for every process to apply on its next search.
+    """
+    # a process seeing the new version before the change was logged
+    # rebuilds its copy instead
+    cache.set(CHANGE_KEY.format(bump_version()), (pk, row),
+              settings.SEARCH_CHANGE_TIMEOUT)
+
+
+def get_changes(since, version):
+    """
+    Returns the changes logged after version ``since`` up to ``version``,
+    or None when the log doesn't cover them all.
+    """
+    if (since is None or
+            not 0 < version - since <= settings.SEARCH_MAX_PENDING_CHANGES):
+        return None
+    keys = [CHANGE_KEY.format(number)
+            for number in range(since + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        return None
+    return [changes[key] for key in keys]
+
+
+def ensure_fresh():
+    version = get_version()
+    if user_index.version != version:
+        with user_index.lock:
+            if user_index.version != version:
+                changes = get_changes(user_index.version, version)
+                if changes is not None:
+                    user_index.update(changes, version=version)
+                else:
+                    user_index.build(MyUser.objects.filter(
+                        is_active=True).values_list(
+                            'pk', 'username', 'full_name'), version=version)
+    return version
+
+
+def search_users(query, limit=None):
+    """
+    Returns the pks of the users best matching ``query``. Results are
+    cached per index version so repeated keystrokes are served without
+    touching the index.
+    """
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    query = normalize(query)
+    if not query:
+        return []
+
+    version = ensure_fresh()
+    key = RESULTS_KEY.format(version, limit,
+                             hashlib.md5(force_bytes(query)).hexdigest())
+    pks = cache.get(key)
+    if pks is None:
+        pks = user_index.search(query, limit)
+        cache.set(key, pks, settings.SEARCH_CACHE_TIMEOUT)
+    return pks
+
+
+def get_usernames(pks):
+    """
+    Usernames of ``pks`` straight from the index, for autocomplete.
+    """
+    indexed = user_index.indexed
+    return [indexed[pk][0] for pk in pks if pk in indexed]
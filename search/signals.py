@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import MyUser
+
+from .index import record_change, user_index
+
+INDEXED_FIELDS = set(['username', 'full_name', 'is_active'])
+
+
+@receiver(post_save, sender=MyUser)
+def reindex_user(sender, instance, created, update_fields=None, **kwargs):
+    # logins save last_login only; skip anything not touching the index
+    if update_fields and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    if (created or user_index.version is None or
+            user_index.is_stale(instance)):
+        record_change(instance.pk, (instance.username, instance.full_name)
+                      if instance.is_active else None)
+
+
+@receiver(post_delete, sender=MyUser)
+def remove_user(sender, instance, **kwargs):
+    record_change(instance.pk)
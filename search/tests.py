@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from accounts.models import MyUser
+
+from .index import ensure_fresh, search_users, user_index, UserIndex
+
+
+def make_user(username):
+    return MyUser.objects.create_user(username=username,
+        email='{}@user.com'.format(username), password='testuser')
+
+
+class UserIndexUnitTest(TestCase):
+
+    def setUp(self):
+        self.index = UserIndex()
+        self.index.build([
+            (1, 'annabel', 'Annabel Lee'),
+            (2, 'ann', 'Ann Smith'),
+            (3, 'bob', 'Bob Anning'),
+            (4, 'carol', ''),
+        ])
+
+    def test_exact_then_prefix_then_full_name(self):
+        self.assertEqual(self.index.search('ann', 10), [2, 1, 3],
+            'results were not ranked by match quality.')
+
+    def test_results_limited(self):
+        self.assertEqual(self.index.search('ann', 2), [2, 1])
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.index.search('CAR', 10), [4])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('zed', 10), [])
+        self.assertEqual(self.index.search('', 10), [])
+
+    def test_update_renames_and_removes(self):
+        self.index.update([(1, ('lee', 'Annabel Lee')), (2, None),
+                           (5, ('anna', ''))])
+
+        self.assertEqual(self.index.search('ann', 10), [5, 3, 1])
+        self.assertEqual(self.index.search('lee', 10), [1])
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UserIndexChangesUnitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user_index.build([])
+
+    def test_signup_applied_without_rebuild(self):
+        annabel = make_user('annabel')
+        ensure_fresh()
+
+        ann = make_user('ann')
+        with self.assertNumQueries(0):
+            self.assertEqual(search_users('ann'), [ann.pk, annabel.pk],
+                'the signup should be applied to the index in place.')
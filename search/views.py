@@ -1,5 +1,5 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.generic.list import ListView
@@ -7,6 +7,8 @@ from django.views.generic.list import ListView
 from accounts.models import MyUser
 from core.mixins import LoginRequiredMixin
 
+from .index import get_usernames, search_users
+
 # Create your views here.
 
 
@@ -24,14 +26,9 @@ class SearchListView(LoginRequiredMixin, ListView):
         query = self.request.GET.get('q')
 
         if query:
-            user_qs = self.model.objects.filter(
-                Q(username__icontains=query)
-                )
-            # adds multiple filters to the queryset
-            # user_qs = self.model.objects.filter(
-            #     Q(username__icontains=query) |
-            #     Q(username__startswith=query)
-            #     )
+            pks = search_users(query, limit=settings.SEARCH_PAGE_LIMIT)
+            users = self.model.objects.in_bulk(pks)
+            return [users[pk] for pk in pks if pk in users]
         return user_qs
 
 
@@ -42,6 +39,6 @@ def search_ajax(request):
     data = {}
 
     if q:
-        users = MyUser.objects.filter(username__icontains=q)
-        data = [{'username': user.username} for user in users]
+        data = [{'username': username}
+                for username in get_usernames(search_users(q))]
     return JsonResponse(data, safe=False)